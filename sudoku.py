@@ -1,31 +1,187 @@
+import functools
+import math
+
 import numpy as np
+from sudoku_validation import validate_boards
+
+# Bitmask helpers: digit d is stored as bit (d - 1), so a mask has one bit per
+# digit of the board. The constants below are for the classic 9x9 board; see
+# Geometry for other sizes.
+ALL_DIGITS = 0x1FF
+DIGIT_BIT = [0] + [1 << (d - 1) for d in range(1, 10)]
+BIT_DIGIT = {1 << (d - 1): d for d in range(1, 10)}
+BOX_INDEX = [[(r // 3) * 3 + c // 3 for c in range(9)] for r in range(9)]
+
+# Largest supported box size (64x64 boards): digit masks must fit the uint64
+# arrays of the vectorized paths, and the lookup tables of a Geometry grow
+# with the fourth power of the box size
+MAX_BOARD_BOX_SIZE = 8
+
+
+def popcount(mask):
+    """Return the number of candidate digits in a mask."""
+    return mask.bit_count()
+
+
+def lowest_digit(mask):
+    """Return the smallest digit in a non-empty mask."""
+    return (mask & -mask).bit_length()
+
+
+def mask_digits(mask):
+    """Yield the digits of a mask in ascending order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length()
+        mask ^= low
+
+
+class Geometry:
+    """
+    Sizes and lookup tables of a board made of box_size x box_size blocks.
+
+    A board has 'size' = box_size**2 rows, columns, blocks and digits. Cells
+    are numbered in row-major order and units in the order rows, columns,
+    blocks. Use geometry() to get a shared instance.
+    """
+
+    def __init__(self, box_size):
+        size = box_size * box_size
+        self.box_size = box_size
+        self.size = size
+        self.num_cells = size * size
+        self.all_digits = (1 << size) - 1
+        self.digit_bit = [0] + [1 << (d - 1) for d in range(1, size + 1)]
+        self.box_index = [
+            [(r // box_size) * box_size + c // box_size for c in range(size)]
+            for r in range(size)
+        ]
+        self.rows = [[row * size + col for col in range(size)] for row in range(size)]
+        self.columns = [
+            [row * size + col for row in range(size)] for col in range(size)
+        ]
+        self.boxes = [
+            [
+                (box // box_size * box_size + i // box_size) * size
+                + box % box_size * box_size
+                + i % box_size
+                for i in range(size)
+            ]
+            for box in range(size)
+        ]
+        self.units = self.rows + self.columns + self.boxes
+        self.all_units = (1 << len(self.units)) - 1
+        # Bit u is set in cell_units[cell] when the cell belongs to units[u]
+        self.cell_units = [
+            1 << (cell // size)
+            | 1 << (size + cell % size)
+            | 1 << (2 * size + self.box_index[cell // size][cell % size])
+            for cell in range(self.num_cells)
+        ]
+        # Indexes in 'units' of the row, column and block of each cell
+        self.cell_unit_indexes = [
+            (
+                cell // size,
+                size + cell % size,
+                2 * size + self.box_index[cell // size][cell % size],
+            )
+            for cell in range(self.num_cells)
+        ]
+        self.peers = [
+            sorted(
+                set(
+                    self.rows[cell // size]
+                    + self.columns[cell % size]
+                    + self.boxes[self.box_index[cell // size][cell % size]]
+                )
+                - {cell}
+            )
+            for cell in range(self.num_cells)
+        ]
+
+    def __repr__(self):
+        return f"Geometry(box_size={self.box_size})"
+
+
+@functools.lru_cache(maxsize=None)
+def geometry(box_size=3):
+    """
+    Return the shared Geometry for a box size (2 for 4x4, 3 for 9x9, ...).
+
+    Raises:
+        ValueError: If box_size is not between 1 and MAX_BOARD_BOX_SIZE
+    """
+    if not 1 <= box_size <= MAX_BOARD_BOX_SIZE:
+        raise ValueError(
+            f"Invalid box size: {box_size} (supported: 1 to {MAX_BOARD_BOX_SIZE})"
+        )
+    return Geometry(box_size)
+
+
+def board_geometry(shape, box_size=None):
+    """
+    Return the Geometry of a board shape, checking that the two agree.
+
+    Args:
+        shape: Shape of the board, (N, N) with N a perfect square
+        box_size: Optional expected box size; inferred from the shape if None
+
+    Raises:
+        ValueError: If the shape is not a valid board for the box size, or
+                    the box size is above MAX_BOARD_BOX_SIZE
+    """
+    shape = tuple(shape)
+    if box_size is None:
+        # Checked before geometry() builds (and caches) the lookup tables
+        side = shape[0] if len(shape) == 2 and shape[0] == shape[1] else 0
+        box_size = math.isqrt(side)
+        if side < 1 or box_size * box_size != side:
+            raise ValueError(
+                f"Sudoku board must be NxN with N a perfect square, got {shape}"
+            )
+    geo = geometry(box_size)
+    if shape != (geo.size, geo.size):
+        raise ValueError(f"Sudoku board must be {geo.size}x{geo.size}")
+    return geo
 
 
 class Sudoku:
-    def __init__(self, board=None):
+    def __init__(self, board=None, box_size=None):
         """
         Initialize a Sudoku board.
-        If no board is provided, creates an empty 9x9 board.
+        If no board is provided, creates an empty board (9x9 by default).
 
         Args:
             board: Optional list of lists or numpy array representing the initial board
                   Use 0 for empty cells
+            box_size: Size of the blocks (2 for 4x4, 3 for 9x9, 4 for 16x16,
+                      ...). Inferred from the board if None.
 
         Raises:
-            ValueError: If the board is not 9x9 or contains invalid numbers
-                      or has repeated numbers in rows, columns or blocks
+            ValueError: If the board is not NxN for the box size or contains
+                      invalid numbers or has repeated numbers in rows, columns or blocks
         """
         if board is None:
-            self.board = np.zeros((9, 9), dtype=int)
+            self._set_geometry(geometry(3 if box_size is None else box_size))
+            self.board = np.zeros((self.size, self.size), dtype=int)
+            self._build_masks()
         else:
             self.board = np.array(board, dtype=int)
-            if self.board.shape != (9, 9):
-                raise ValueError("Sudoku board must be 9x9")
+            self._set_geometry(board_geometry(self.board.shape, box_size))
             if not self._is_valid_board():
                 raise ValueError(
                     "Invalid initial board: contains invalid numbers or repeated numbers in rows, columns or blocks"
                 )
 
+    def _set_geometry(self, geo):
+        self.geometry = geo
+        self.box_size = geo.box_size
+        self.size = geo.size
+        self.all_digits = geo.all_digits
+        # Bound once: candidates() is called at every node of the searches
+        self._box_index = geo.box_index
+        self._digit_bit = geo.digit_bit
+
     def get_row(self, row):
         """Get a specific row from the board."""
         return self.board[row]
@@ -35,19 +191,77 @@ class Sudoku:
         return self.board[:, col]
 
     def get_block(self, row, col):
-        """Get the 3x3 block that contains the cell at (row, col)."""
-        block_row = (row // 3) * 3
-        block_col = (col // 3) * 3
-        return self.board[block_row : block_row + 3, block_col : block_col + 3]
+        """Get the block that contains the cell at (row, col)."""
+        box_size = self.box_size
+        block_row = (row // box_size) * box_size
+        block_col = (col // box_size) * box_size
+        return self.board[
+            block_row : block_row + box_size, block_col : block_col + box_size
+        ]
+
+    def _build_masks(self):
+        """
+        Rebuild the row, column and block occupancy masks from the board.
+
+        Returns:
+            bool: False if a digit is repeated in any row, column or block
+        """
+        self.row_masks = [0] * self.size
+        self.col_masks = [0] * self.size
+        self.box_masks = [0] * self.size
+        digit_bit = self._digit_bit
+        box_index = self._box_index
+        valid = True
+        for row, values in enumerate(self.board.tolist()):
+            for col, num in enumerate(values):
+                if num:
+                    bit = digit_bit[num]
+                    box = box_index[row][col]
+                    if (
+                        self.row_masks[row] | self.col_masks[col] | self.box_masks[box]
+                    ) & bit:
+                        valid = False
+                    self.row_masks[row] |= bit
+                    self.col_masks[col] |= bit
+                    self.box_masks[box] |= bit
+        return valid
+
+    def candidates(self, row, col):
+        """
+        Get the digits that can still be placed at (row, col), as a bitmask.
+
+        The cell itself is not checked; call this for empty cells only.
+        """
+        return self.all_digits & ~(
+            self.row_masks[row]
+            | self.col_masks[col]
+            | self.box_masks[self._box_index[row][col]]
+        )
+
+    def _assign(self, row, col, num):
+        """Place 'num' at (row, col) without validation, keeping masks in sync."""
+        bit = self._digit_bit[num]
+        self.board[row, col] = num
+        self.row_masks[row] |= bit
+        self.col_masks[col] |= bit
+        self.box_masks[self._box_index[row][col]] |= bit
+
+    def _unassign(self, row, col, num):
+        """Remove 'num' from (row, col) without validation, keeping masks in sync."""
+        bit = ~self._digit_bit[num]
+        self.board[row, col] = 0
+        self.row_masks[row] &= bit
+        self.col_masks[col] &= bit
+        self.box_masks[self._box_index[row][col]] &= bit
 
     def is_valid_move(self, row, col, num):
         """
         Check if placing number 'num' at position (row, col) is valid.
 
         Args:
-            row: Row index (0-8)
-            col: Column index (0-8)
-            num: Number to check (1-9)
+            row: Row index (0 to size - 1)
+            col: Column index (0 to size - 1)
+            num: Number to check (1 to size)
 
         Returns:
             bool: True if the move is valid, False otherwise
@@ -56,110 +270,324 @@ class Sudoku:
         if self.board[row, col] != 0:
             return False
 
-        # Check row
-        if num in self.get_row(row):
-            return False
-
-        # Check column
-        if num in self.get_column(col):
-            return False
-
-        # Check 3x3 block
-        if num in self.get_block(row, col).flatten():
-            return False
-
-        return True
+        # Check row, column and block at once
+        return bool(self.candidates(row, col) & self._digit_bit[num])
 
     def set_value(self, row, col, num):
         """
         Set a value in the board if it's a valid move.
 
         Args:
-            row: Row index (0-8)
-            col: Column index (0-8)
-            num: Number to place (1-9)
+            row: Row index (0 to size - 1)
+            col: Column index (0 to size - 1)
+            num: Number to place (1 to size)
 
         Returns:
             bool: True if the value was set, False otherwise
         """
-        if not (0 <= row < 9 and 0 <= col < 9 and 1 <= num <= 9):
+        size = self.size
+        if not (0 <= row < size and 0 <= col < size and 1 <= num <= size):
             return False
 
         if self.is_valid_move(row, col, num):
-            self.board[row, col] = num
+            self._assign(row, col, num)
             return True
         return False
 
     def clear_cell(self, row, col):
         """Clear a cell by setting it to 0."""
-        self.board[row, col] = 0
+        num = int(self.board[row, col])
+        if num:
+            self._unassign(row, col, num)
 
     def is_complete(self):
         """Check if the board is completely filled and valid."""
-        if 0 in self.board:
-            return False
-
-        # Check all rows, columns and blocks
-        for i in range(9):
-            if not (
-                set(self.get_row(i)) == set(range(1, 10))
-                and set(self.get_column(i)) == set(range(1, 10))
-            ):
-                return False
-
-        # Check blocks
-        for i in range(0, 9, 3):
-            for j in range(0, 9, 3):
-                if set(self.get_block(i, j).flatten()) != set(range(1, 10)):
-                    return False
-
-        return True
+        valid, _ = validate_boards(self.board[np.newaxis], complete=True)
+        return bool(valid[0])
 
     def _is_valid_board(self):
         """
         Check if the initial board is valid.
         A valid board must:
-        1. Contain only numbers from 0-9 (0 represents empty cells)
-        2. Not have repeated numbers (1-9) in any row, column or 3x3 block
+        1. Contain only numbers from 0 to size (0 represents empty cells)
+        2. Not have repeated numbers in any row, column or block
 
         Returns:
             bool: True if the board is valid, False otherwise
         """
-        # Check if all numbers are in valid range (0-9)
-        if not np.all((self.board >= 0) & (self.board <= 9)):
+        # Check if all numbers are in valid range
+        if not np.all((self.board >= 0) & (self.board <= self.size)):
+            return False
+
+        # Check for duplicates while building the occupancy masks
+        return self._build_masks()
+
+    def __str__(self):
+        """Return a string representation of the board."""
+        return _format_board(self.board.tolist(), self.box_size)
+
+
+def _format_board(rows, box_size):
+    """Lay out rows of values with separators between the blocks."""
+    size = box_size * box_size
+    width = len(str(size))
+    separator = "-" * (size * (width + 1) + 2 * box_size - 3) + "\n"
+    lines = []
+    for i, values in enumerate(rows):
+        if i % box_size == 0 and i != 0:
+            lines.append(separator)
+        cells = []
+        for j, num in enumerate(values):
+            if j % box_size == 0 and j != 0:
+                cells.append("| ")
+            cells.append(f"{'-' if num == 0 else num:>{width}} ")
+        lines.append("".join(cells) + "\n")
+    return "".join(lines)
+
+
+class Board:
+    """
+    Compact board for code that handles many short-lived boards.
+
+    The cells are a bytearray in row-major order, one byte per cell, and the
+    row, column and block occupancy masks are only built when a method needs
+    them. from_buffer() wraps trusted data without any validation, and
+    copy(), snapshot() and restore() copy a few hundred bytes at most.
+
+    The methods follow Sudoku; np.asarray(board) and Sudoku(board) convert
+    a Board, and Board(sudoku.board) converts back.
+    """
+
+    __slots__ = ("geometry", "cells", "_row_masks", "_col_masks", "_box_masks")
+
+    def __init__(self, board=None, box_size=None):
+        """
+        Args:
+            board: Optional list of lists or numpy array (0 for empty cells);
+                   an empty 9x9 board (or box_size board) if None
+            box_size: Size of the blocks, inferred from the board if None
+
+        Raises:
+            ValueError: If the board is not NxN for the box size or contains
+                      invalid numbers or has repeated numbers in rows, columns or blocks
+        """
+        if board is None:
+            self.geometry = geometry(3 if box_size is None else box_size)
+            self.cells = bytearray(self.geometry.num_cells)
+        else:
+            values = np.asarray(board)
+            self.geometry = board_geometry(values.shape, box_size)
+            if values.size and (values.min() < 0 or values.max() > self.size):
+                raise ValueError(
+                    "Invalid initial board: contains invalid numbers or repeated numbers in rows, columns or blocks"
+                )
+            self.cells = bytearray(values.astype(np.uint8).tobytes())
+        self._row_masks = None
+        if not self._build_masks():
+            raise ValueError(
+                "Invalid initial board: contains invalid numbers or repeated numbers in rows, columns or blocks"
+            )
+
+    @classmethod
+    def from_buffer(cls, data, box_size=3):
+        """
+        Wrap trusted cell values without validation.
+
+        Args:
+            data: size * size bytes (or any buffer of uint8 values, such as a
+                  uint8 numpy array) in row-major order, each 0 to size
+            box_size: Size of the blocks
+
+        Returns:
+            Board: A board owning a copy of the data
+        """
+        board = cls.__new__(cls)
+        board.geometry = geometry(box_size)
+        board.cells = bytearray(data)
+        board._row_masks = None
+        return board
+
+    @property
+    def box_size(self):
+        return self.geometry.box_size
+
+    @property
+    def size(self):
+        return self.geometry.size
+
+    @property
+    def board(self):
+        """Read-only (size, size) uint8 view of the cells (no copy)."""
+        view = np.frombuffer(self.cells, dtype=np.uint8).reshape(self.size, self.size)
+        view.flags.writeable = False
+        return view
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.board, dtype=dtype)
+
+    def tobytes(self):
+        """Return the cells as bytes, e.g. for use as a dict key."""
+        return bytes(self.cells)
+
+    def _build_masks(self):
+        """
+        Build the row, column and block occupancy masks from the cells.
+
+        Returns:
+            bool: False if a digit is repeated in any row, column or block
+        """
+        geo = self.geometry
+        size = geo.size
+        rows = [0] * size
+        cols = [0] * size
+        boxes = [0] * size
+        digit_bit = geo.digit_bit
+        box_index = geo.box_index
+        valid = True
+        for cell, num in enumerate(self.cells):
+            if num:
+                row, col = divmod(cell, size)
+                bit = digit_bit[num]
+                box = box_index[row][col]
+                if (rows[row] | cols[col] | boxes[box]) & bit:
+                    valid = False
+                rows[row] |= bit
+                cols[col] |= bit
+                boxes[box] |= bit
+        self._row_masks, self._col_masks, self._box_masks = rows, cols, boxes
+        return valid
+
+    def get(self, row, col):
+        """Return the value at (row, col), 0 if the cell is empty."""
+        return self.cells[row * self.geometry.size + col]
+
+    def get_row(self, row):
+        """Get a specific row from the board."""
+        return self.board[row]
+
+    def get_column(self, col):
+        """Get a specific column from the board."""
+        return self.board[:, col]
+
+    def get_block(self, row, col):
+        """Get the block that contains the cell at (row, col)."""
+        box_size = self.box_size
+        block_row = (row // box_size) * box_size
+        block_col = (col // box_size) * box_size
+        return self.board[
+            block_row : block_row + box_size, block_col : block_col + box_size
+        ]
+
+    def candidates(self, row, col):
+        """
+        Get the digits that can still be placed at (row, col), as a bitmask.
+
+        The cell itself is not checked; call this for empty cells only.
+        """
+        if self._row_masks is None:
+            self._build_masks()
+        geo = self.geometry
+        return geo.all_digits & ~(
+            self._row_masks[row]
+            | self._col_masks[col]
+            | self._box_masks[geo.box_index[row][col]]
+        )
+
+    def _assign(self, row, col, num):
+        """Place 'num' at (row, col) without validation, keeping masks in sync."""
+        geo = self.geometry
+        self.cells[row * geo.size + col] = num
+        if self._row_masks is not None:
+            bit = geo.digit_bit[num]
+            self._row_masks[row] |= bit
+            self._col_masks[col] |= bit
+            self._box_masks[geo.box_index[row][col]] |= bit
+
+    def _unassign(self, row, col, num):
+        """Remove 'num' from (row, col) without validation, keeping masks in sync."""
+        geo = self.geometry
+        self.cells[row * geo.size + col] = 0
+        if self._row_masks is not None:
+            bit = ~geo.digit_bit[num]
+            self._row_masks[row] &= bit
+            self._col_masks[col] &= bit
+            self._box_masks[geo.box_index[row][col]] &= bit
+
+    def is_valid_move(self, row, col, num):
+        """Check if placing number 'num' at position (row, col) is valid."""
+        if self.get(row, col) != 0:
             return False
+        return bool(self.candidates(row, col) & self.geometry.digit_bit[num])
+
+    def set_value(self, row, col, num):
+        """
+        Set a value in the board if it's a valid move.
 
-        # Check rows and columns
-        for i in range(9):
-            # Get non-zero numbers in row and column
-            row_nums = self.get_row(i)[self.get_row(i) != 0]
-            col_nums = self.get_column(i)[self.get_column(i) != 0]
+        Returns:
+            bool: True if the value was set, False otherwise
+        """
+        size = self.size
+        if not (0 <= row < size and 0 <= col < size and 1 <= num <= size):
+            return False
+        if self.is_valid_move(row, col, num):
+            self._assign(row, col, num)
+            return True
+        return False
+
+    def clear_cell(self, row, col):
+        """Clear a cell by setting it to 0."""
+        num = self.get(row, col)
+        if num:
+            self._unassign(row, col, num)
+
+    def is_complete(self):
+        """Check if the board is completely filled and valid."""
+        valid, _ = validate_boards(self.board[np.newaxis], complete=True)
+        return bool(valid[0])
+
+    def copy(self):
+        """Return an independent copy of the board."""
+        board = Board.__new__(Board)
+        board.geometry = self.geometry
+        board.cells = bytearray(self.cells)
+        board._row_masks = None
+        if self._row_masks is not None:
+            board._row_masks = self._row_masks[:]
+            board._col_masks = self._col_masks[:]
+            board._box_masks = self._box_masks[:]
+        return board
+
+    def snapshot(self):
+        """Capture the current state, to be brought back with restore()."""
+        if self._row_masks is None:
+            return bytes(self.cells), None
+        return bytes(self.cells), (
+            tuple(self._row_masks),
+            tuple(self._col_masks),
+            tuple(self._box_masks),
+        )
+
+    def restore(self, snapshot):
+        """Return to a state captured by snapshot() (which can be reused)."""
+        cells, masks = snapshot
+        self.cells[:] = cells
+        if masks is None:
+            self._row_masks = None
+        else:
+            self._row_masks = list(masks[0])
+            self._col_masks = list(masks[1])
+            self._box_masks = list(masks[2])
 
-            # Check for duplicates (if length of unique numbers is less than total numbers)
-            if len(np.unique(row_nums)) < len(row_nums) or len(
-                np.unique(col_nums)
-            ) < len(col_nums):
-                return False
+    def __eq__(self, other):
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self.geometry is other.geometry and self.cells == other.cells
 
-        # Check 3x3 blocks
-        for i in range(0, 9, 3):
-            for j in range(0, 9, 3):
-                block = self.get_block(i, j)
-                block_nums = block[block != 0]
-                if len(np.unique(block_nums)) < len(block_nums):
-                    return False
+    __hash__ = None
 
-        return True
+    def __repr__(self):
+        return f"Board({self.board.tolist()})"
 
     def __str__(self):
         """Return a string representation of the board."""
-        result = ""
-        for i in range(9):
-            if i % 3 == 0 and i != 0:
-                result += "-" * 21 + "\n"
-            for j in range(9):
-                if j % 3 == 0 and j != 0:
-                    result += "| "
-                result += "- " if self.board[i, j] == 0 else str(self.board[i, j]) + " "
-            result += "\n"
-        return result
+        return _format_board(self.board.tolist(), self.box_size)
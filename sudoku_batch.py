@@ -0,0 +1,153 @@
+import functools
+import itertools
+import os
+import threading
+import time
+
+from sudoku_solvers import SolveResult, SudokuSolver, check_budget
+
+
+def solve_one(board, method, max_steps=None, stats=False, timeout=None):
+    """
+    Solve a single board, turning invalid input into a failed result.
+
+    This is the job solve_many runs for every puzzle; it is picklable, so
+    other process pools can use it too.
+
+    Returns:
+        SolveResult: The outcome, with 'error' set for rejected boards and
+                     'elapsed' covering the board setup as well
+    """
+    start = time.perf_counter()
+    try:
+        solver = SudokuSolver(board, max_steps=max_steps, stats=stats, timeout=timeout)
+    except ValueError as e:
+        return SolveResult(
+            method, False, None, 0, time.perf_counter() - start, error=str(e)
+        )
+    result = solver.solve(method)
+    # Report the wall time of the whole job, including board setup
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def _run_chunk(task):
+    """Worker entry point: apply a function to a chunk of (index, item) pairs."""
+    func, chunk = task
+    return [(index, func(item)) for index, item in chunk]
+
+
+def _chunks(items, chunksize):
+    """Split an iterable into lists of (index, item) pairs."""
+    numbered = enumerate(items)
+    while True:
+        chunk = list(itertools.islice(numbered, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_many(func, items, workers=None, chunksize=64, ordered=True, max_pending=4):
+    """
+    Apply a function to many items, streaming the results from a process pool.
+
+    Items are read lazily: at most 'max_pending' chunks per worker are in
+    flight at any time, so arbitrarily large inputs run in constant memory.
+
+    Args:
+        func: Picklable function of one item (a module-level function or a
+              functools.partial of one)
+        items: Iterable of inputs
+        workers: Number of worker processes (defaults to the CPU count);
+                 1 runs in the calling process without a pool
+        chunksize: Number of items sent to a worker at a time
+        ordered: Yield results in input order if True, as they finish otherwise
+        max_pending: Chunks queued per worker before reading more input
+
+    Yields:
+        tuple: (index, result) for every item, where index is its position
+               in the input
+
+    Raises:
+        ValueError: If chunksize or workers are not positive
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1 or chunksize < 1:
+        raise ValueError("workers and chunksize must be positive")
+
+    if workers == 1:
+        for chunk in _chunks(items, chunksize):
+            yield from _run_chunk((func, chunk))
+        return
+
+    # Pool.imap consumes its input eagerly; the semaphore keeps it bounded
+    pending = threading.Semaphore(workers * max_pending)
+    stopped = threading.Event()
+
+    def tasks():
+        for chunk in _chunks(items, chunksize):
+            pending.acquire()
+            if stopped.is_set():
+                return
+            yield func, chunk
+
+    # Imported here so single-process runs start faster
+    import multiprocessing
+
+    with multiprocessing.Pool(workers) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+        try:
+            for results in imap(_run_chunk, tasks()):
+                pending.release()
+                yield from results
+        finally:
+            # Unblock the feeder thread if the caller stopped iterating early
+            stopped.set()
+            pending.release()
+
+
+def solve_many(
+    puzzles,
+    method="dlx",
+    workers=None,
+    chunksize=64,
+    ordered=True,
+    max_pending=4,
+    max_steps=None,
+    stats=False,
+    timeout=None,
+):
+    """
+    Solve many puzzles, streaming the results from a process pool.
+
+    See map_many for how the input is streamed and distributed.
+
+    Args:
+        puzzles: Iterable of boards (list of lists or numpy arrays)
+        method: One of SudokuSolver.METHODS
+        workers: Number of worker processes (defaults to the CPU count);
+                 1 solves in the calling process without a pool
+        chunksize: Number of puzzles sent to a worker at a time
+        ordered: Yield results in input order if True, as they finish otherwise
+        max_pending: Chunks queued per worker before reading more input
+        max_steps: Optional per-puzzle step budget (see SudokuSolver)
+        stats: Collect a SolveStats for every puzzle (SolveResult.stats)
+        timeout: Optional per-puzzle limit on the search time in seconds
+
+    Yields:
+        tuple: (index, SolveResult) for every puzzle, where index is its
+               position in the input
+
+    Raises:
+        ValueError: If the method is unknown, chunksize/workers are not
+                    positive or a budget is invalid (see check_budget)
+    """
+    if method not in SudokuSolver.METHODS:
+        raise ValueError(f"Unknown solving method: {method}")
+    # Checked once here rather than failing every puzzle in the workers
+    check_budget(max_steps, timeout)
+    func = functools.partial(
+        solve_one, method=method, max_steps=max_steps, stats=stats, timeout=timeout
+    )
+    return map_many(func, puzzles, workers, chunksize, ordered, max_pending)
@@ -0,0 +1,259 @@
+"""
+Reproducible benchmark of the headless solvers.
+
+Runs every solving method over fixed, seeded puzzle corpora and reports
+throughput, latency percentiles, step counts and peak memory. Results can be
+written as JSON to compare versions:
+
+    python sudoku_benchmark.py --json bench.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from sudoku_generator import SudokuGenerator
+from sudoku_io import parse_puzzle
+from sudoku_solvers import SudokuSolver
+
+# Known 17-clue puzzles (the minimum for a unique solution)
+SEVENTEEN_CLUE = [
+    "000000010400000000020000000000050407008000300001090000300400200050100000000806000",
+    "000000010400000000020000000000050604008000300001090000300400200050100000000807000",
+    "000000012000035000000600070700000300000400800100000000000120000080000040050000600",
+    "000000012003600000000007000410020000000500300700000600280000040000300500000000000",
+    "000000012008030000000000040120500000000004700060000000507000300000620000000100000",
+    "000000012040050000000009000070600400000100000000000050000087500601000300200000000",
+    "000000012050400000000000030700600400001000000000080000920000800000510700000003000",
+    "000000012300000060000040000900000500000001070020000000000350400001400800060000000",
+    "000000012400090000000000050070200000600000400000108000018000000000030700502000000",
+    "000000012500008000000700000600120000700000450000030000030000800000500700020000000",
+]
+
+# Puzzles that are known to be very slow for naive row-major backtracking,
+# mostly because their first rows are nearly empty
+ADVERSARIAL = [
+    "..............3.85..1.2.......5.7.....4...1...9.......5......73..2.1........4...9",
+    "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+    "52...6.........7.13...........4..8..6......5...........418.........3..2...87.....",
+    "6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....",
+    "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....",
+    "....14....3....2...7..........9...3.6.1.............8.2.....1.4....5.6.....7.8...",
+]
+
+TIERS = ("easy", "hard", "17-clue", "adversarial")
+
+
+def build_corpus(tier, count=20, seed=0):
+    """
+    Build the puzzles of a difficulty tier.
+
+    Generated tiers are reproducible for a given seed; fixed tiers ignore
+    count and seed.
+
+    Args:
+        tier: One of TIERS
+        count: Number of puzzles for generated tiers
+        seed: Seed for generated tiers
+
+    Returns:
+        list: (9, 9) boards
+
+    Raises:
+        ValueError: If the tier is unknown
+    """
+    if tier == "17-clue":
+        return [parse_puzzle(line) for line in SEVENTEEN_CLUE]
+    if tier == "adversarial":
+        return [parse_puzzle(line) for line in ADVERSARIAL]
+    if tier not in TIERS:
+        raise ValueError(f"Unknown tier: {tier}")
+
+    generator = SudokuGenerator(rng=random.Random(f"{tier}-{seed}"))
+    puzzles = []
+    for _ in range(count):
+        if tier == "easy":
+            puzzle, _ = generator.generate_unique(num_clues=36)
+        else:
+            # As sparse as the grid allows: a minimal unique puzzle
+            puzzle, _ = generator.generate_unique(num_clues=17)
+        puzzles.append(puzzle.board.copy())
+    return puzzles
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def benchmark_method(method, puzzles, max_steps=None, seed=0, measure_memory=True):
+    """
+    Solve every puzzle with one method and summarize the run.
+
+    Args:
+        method: One of SudokuSolver.METHODS
+        puzzles: List of boards
+        max_steps: Per-puzzle step budget (exhausted puzzles count as unsolved)
+        seed: Seed for the stochastic solver
+        measure_memory: Also run a second pass under tracemalloc to record
+                        the peak memory of a single solve
+
+    Returns:
+        dict: Throughput, latency percentiles (ms), steps and memory statistics
+    """
+    latencies = []
+    steps = []
+    solved = exhausted = 0
+    start = time.perf_counter()
+    for index, board in enumerate(puzzles):
+        t0 = time.perf_counter()
+        solver = SudokuSolver(
+            board, rng=random.Random(seed + index), max_steps=max_steps
+        )
+        result = solver.solve(method)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        steps.append(result.steps)
+        solved += result.solved
+        exhausted += result.exhausted
+    total = time.perf_counter() - start
+
+    peak = None
+    if measure_memory:
+        # tracemalloc slows allocation down, so it gets its own pass
+        peak = 0
+        tracemalloc.start()
+        try:
+            for index, board in enumerate(puzzles):
+                tracemalloc.reset_peak()
+                solver = SudokuSolver(
+                    board, rng=random.Random(seed + index), max_steps=max_steps
+                )
+                solver.solve(method)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "method": method,
+        "puzzles": len(puzzles),
+        "solved": solved,
+        "exhausted": exhausted,
+        "total_seconds": total,
+        "puzzles_per_second": len(puzzles) / total if total else 0.0,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "max": max(latencies, default=0.0),
+        },
+        "steps": {
+            "mean": float(np.mean(steps)) if steps else 0.0,
+            "max": max(steps, default=0),
+        },
+        "peak_memory_bytes": peak,
+    }
+
+
+def run_benchmark(
+    methods=SudokuSolver.METHODS,
+    tiers=TIERS,
+    count=20,
+    seed=0,
+    max_steps=200_000,
+    measure_memory=True,
+):
+    """
+    Benchmark several methods over several tiers.
+
+    Returns:
+        dict: Environment metadata, settings and one entry per (tier, method)
+    """
+    results = []
+    for tier in tiers:
+        puzzles = build_corpus(tier, count, seed)
+        for method in methods:
+            entry = benchmark_method(method, puzzles, max_steps, seed, measure_memory)
+            entry["tier"] = tier
+            results.append(entry)
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "settings": {
+            "count": count,
+            "seed": seed,
+            "max_steps": max_steps,
+        },
+        "results": results,
+    }
+
+
+def format_report(report):
+    """Format a run_benchmark report as a text table."""
+    lines = [
+        f"{'tier':<12}{'method':<24}{'solved':>9}{'puz/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'steps':>10}{'peak KiB':>10}"
+    ]
+    for entry in report["results"]:
+        latency = entry["latency_ms"]
+        peak = entry["peak_memory_bytes"]
+        lines.append(
+            f"{entry['tier']:<12}{entry['method']:<24}"
+            f"{entry['solved']:>4}/{entry['puzzles']:<4}"
+            f"{entry['puzzles_per_second']:>10.1f}"
+            f"{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}"
+            f"{entry['steps']['mean']:>10.0f}"
+            f"{'-' if peak is None else f'{peak / 1024:.0f}':>10}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--methods",
+        nargs="+",
+        choices=SudokuSolver.METHODS,
+        default=list(SudokuSolver.METHODS),
+    )
+    parser.add_argument("--tiers", nargs="+", choices=TIERS, default=list(TIERS))
+    parser.add_argument(
+        "--count", type=int, default=20, help="puzzles per generated tier"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--max-steps",
+        type=int,
+        default=200_000,
+        help="per-puzzle step budget (0 for unlimited)",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the peak memory pass"
+    )
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        args.methods,
+        args.tiers,
+        args.count,
+        args.seed,
+        args.max_steps or None,
+        not args.no_memory,
+    )
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import collections
+import dbm
+
+import numpy as np
+
+from sudoku import board_geometry
+from sudoku_canonical import MAX_BOX_SIZE, MIN_CANONICAL_CLUES, canonicalize
+from sudoku_solvers import SudokuSolver
+
+# Keys are a one-byte prefix followed by the board's cells as uint8 bytes.
+# Exact entries map a board as submitted to its solution, so repeats of the
+# same grid skip canonicalization altogether. Canonical entries map the
+# canonical form to the solution of the canonical board and are shared by
+# every equivalent grid. An empty value records that there is no solution.
+_EXACT = b"="
+_CANONICAL = b"~"
+_NO_SOLUTION = b""
+
+
+class SolutionCache:
+    """
+    Bounded LRU cache of solutions keyed on the canonical form of puzzles.
+
+    A lookup first tries the board exactly as given, which costs a few
+    microseconds. Otherwise the board is canonicalized (see sudoku_canonical,
+    a few milliseconds) so that relabeled, permuted or transposed variants of
+    a cached puzzle are answered by transforming its stored solution back.
+    Only a miss runs a solver.
+
+    With a path, canonical entries are also written through to a dbm file,
+    which is consulted when an entry is not in memory and survives restarts.
+    Boards larger than 9x9, and boards with fewer clues than a puzzle with a
+    unique solution needs (17, or 4 on 4x4; see MIN_CANONICAL_CLUES), are
+    cached by exact match only, since canonicalizing them can take seconds.
+    """
+
+    def __init__(self, maxsize=65536, path=None, method="dlx"):
+        """
+        Args:
+            maxsize: Maximum number of entries kept in memory
+            path: Optional dbm file that stores canonical entries on disk
+            method: One of SudokuSolver.METHODS, used on cache misses
+
+        Raises:
+            ValueError: If maxsize is not positive or the method is unknown
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        if method not in SudokuSolver.METHODS:
+            raise ValueError(f"Unknown solving method: {method}")
+        self.maxsize = maxsize
+        self.method = method
+        self.hits = 0  # Boards answered from an exact entry
+        self.canonical_hits = 0  # Boards answered through an equivalent grid
+        self.misses = 0  # Boards that had to be solved
+        self._entries = collections.OrderedDict()
+        self._db = dbm.open(str(path), "c") if path is not None else None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            return value
+        if self._db is not None and key.startswith(_CANONICAL):
+            value = self._db.get(key)
+            if value is not None:
+                self._put(key, value, persist=False)
+        return value
+
+    def _put(self, key, value, persist=True):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        if persist and self._db is not None and key.startswith(_CANONICAL):
+            self._db[key] = value
+
+    @staticmethod
+    def _decode(value, size):
+        if value == _NO_SOLUTION:
+            return None
+        return np.frombuffer(value, dtype=np.uint8).reshape(size, size).copy()
+
+    def solve(self, board):
+        """
+        Return the solution of a board, solving it only on a cache miss.
+
+        Args:
+            board: List of lists or numpy array (0 for empty cells)
+
+        Returns:
+            numpy.ndarray or None: The solution as a uint8 array, or None if
+            the board has no solution
+
+        Raises:
+            ValueError: If the board has the wrong shape or invalid givens
+        """
+        board = np.asarray(board, dtype=np.uint8)
+        geo = board_geometry(board.shape)
+        size = geo.size
+        exact = _EXACT + board.tobytes()
+        value = self._get(exact)
+        if value is not None:
+            self.hits += 1
+            return self._decode(value, size)
+
+        if geo.box_size > MAX_BOX_SIZE or np.count_nonzero(
+            board
+        ) < MIN_CANONICAL_CLUES.get(geo.box_size, 0):
+            self.misses += 1
+            solution = self._solve(board)
+        else:
+            canonical, transform = canonicalize(board)
+            key = _CANONICAL + canonical.tobytes()
+            value = self._get(key)
+            if value is not None:
+                self.canonical_hits += 1
+                solution = self._decode(value, size)
+                if solution is not None:
+                    solution = transform.invert(solution)
+            else:
+                self.misses += 1
+                solution = self._solve(board)
+                self._put(
+                    key,
+                    (
+                        _NO_SOLUTION
+                        if solution is None
+                        else transform.apply(solution).tobytes()
+                    ),
+                )
+
+        self._put(exact, _NO_SOLUTION if solution is None else solution.tobytes())
+        return solution
+
+    def _solve(self, board):
+        result = SudokuSolver(board).solve(self.method)
+        return result.solution.astype(np.uint8) if result.solved else None
+
+    def clear(self):
+        """Drop every in-memory entry (the disk store is kept)."""
+        self._entries.clear()
+
+    def close(self):
+        """Close the disk store, if any."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,351 @@
+"""
+Command-line tool to solve, generate, validate and rate Sudoku puzzles.
+
+Puzzles are read and written one per line (see sudoku_io), from files or
+stdin/stdout, so commands can be chained in shell pipelines:
+
+    sudoku generate 1000 --seed 7 | sudoku solve --jobs 4 > solutions.txt
+
+Only argparse is loaded at startup; numpy and the solver modules are
+imported by the command that needs them, and matplotlib never is.
+"""
+
+import argparse
+import collections
+import os
+import sys
+
+
+def _input(path):
+    """Return the binary stream or path puzzles are read from."""
+    return sys.stdin.buffer if path == "-" else path
+
+
+class _Output:
+    """Line writer to a file or stdout, flushed every 'flush_every' lines."""
+
+    def __init__(self, path, flush_every=64):
+        self.file = sys.stdout.buffer if path == "-" else open(path, "wb")
+        self.flush_every = flush_every
+        self.pending = 0
+
+    def write(self, line):
+        self.file.write(line.encode("ascii") + b"\n")
+        self.pending += 1
+        if self.pending >= self.flush_every:
+            self.file.flush()
+            self.pending = 0
+
+    def close(self):
+        if self.file is sys.stdout.buffer:
+            self.file.flush()
+        else:
+            self.file.close()
+
+
+def _jobs(value):
+    """Worker processes for --jobs: 0 means one per CPU."""
+    jobs = int(value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError("must be 0 or more")
+    return jobs or os.cpu_count() or 1
+
+
+def _report(message):
+    print(f"sudoku: {message}", file=sys.stderr)
+
+
+def cmd_solve(args):
+    from sudoku_batch import solve_many
+    from sudoku_io import format_puzzle, read_puzzles
+
+    # Results come back in input order, so the puzzles waiting for theirs
+    # form a queue bounded by the work in flight
+    waiting = collections.deque()
+
+    def puzzles():
+        for board in read_puzzles(_input(args.input)):
+            waiting.append(board)
+            yield board
+
+    if args.method == "portfolio":
+        if args.jobs > 1:
+            raise ValueError("--jobs does not apply to the portfolio method")
+        results = _portfolio_results(puzzles(), args)
+    else:
+        results = solve_many(
+            puzzles(),
+            args.method,
+            args.jobs,
+            args.chunksize,
+            max_steps=args.max_steps or None,
+            timeout=args.timeout,
+        )
+
+    failed = 0
+    out = _Output(args.output, args.chunksize)
+    try:
+        for index, result in results:
+            puzzle = waiting.popleft()
+            if result.solved:
+                out.write(format_puzzle(result.solution, args.empty))
+                continue
+            # Keep one line per puzzle, so the output lines up with the input
+            out.write(format_puzzle(puzzle, args.empty))
+            failed += 1
+            if result.error:
+                reason = result.error
+            elif result.exhausted:
+                reason = "search budget exhausted"
+            else:
+                reason = "no solution"
+            _report(f"puzzle {index + 1}: {reason}")
+    finally:
+        out.close()
+    return 1 if failed else 0
+
+
+def _portfolio_results(puzzles, args):
+    """Solve puzzles with a PortfolioSolver, keeping its statistics in --stats."""
+    from sudoku_portfolio import PortfolioSolver, SelectionStats
+    from sudoku_solvers import SolveResult
+
+    stats = None
+    if args.stats and os.path.exists(args.stats):
+        stats = SelectionStats.load(args.stats)
+    solver = PortfolioSolver(
+        stats=stats, timeout=args.timeout, max_steps=args.max_steps or None
+    )
+    try:
+        for index, board in enumerate(puzzles):
+            try:
+                yield index, solver.solve(board)
+            except ValueError as e:
+                yield index, SolveResult("portfolio", False, None, 0, error=str(e))
+    finally:
+        if args.stats:
+            solver.stats.save(args.stats)
+
+
+def cmd_generate(args):
+    from sudoku_generator import generate_many
+    from sudoku_io import format_puzzle
+
+    out = _Output(args.output, args.chunksize)
+    try:
+        for _, puzzle, solution in generate_many(
+            args.count,
+            args.seed,
+            args.clues,
+            args.symmetry,
+            dedupe=None if args.dedupe == "none" else args.dedupe,
+            start=args.start,
+            workers=args.jobs,
+            chunksize=args.chunksize,
+        ):
+            line = format_puzzle(puzzle, args.empty)
+            if args.solutions:
+                line += "," + format_puzzle(solution, args.empty)
+            out.write(line)
+    finally:
+        out.close()
+    return 0
+
+
+def cmd_validate(args):
+    from sudoku_io import format_puzzle, read_puzzle_batches
+    from sudoku_validation import unit_name, validate_boards
+
+    invalid = 0
+    count = 0
+    # With --filter the valid puzzles are the output, and problems go to stderr
+    out = _Output(args.output, args.batch_size) if args.filter else None
+    try:
+        for batch in read_puzzle_batches(_input(args.input), args.batch_size):
+            valid, first_unit = validate_boards(batch, complete=args.complete)
+            for i in range(len(batch)):
+                if valid[i]:
+                    if out:
+                        out.write(format_puzzle(batch[i], args.empty))
+                    continue
+                invalid += 1
+                if args.quiet:
+                    continue
+                message = f"puzzle {count + i + 1}: invalid {unit_name(first_unit[i])}"
+                if out:
+                    _report(message)
+                else:
+                    print(message)
+            count += len(batch)
+    finally:
+        if out:
+            out.close()
+    if not args.quiet:
+        _report(f"{count - invalid} of {count} puzzles valid")
+    return 1 if invalid else 0
+
+
+def cmd_rate(args):
+    import json
+
+    from sudoku_io import format_puzzle, read_puzzles
+    from sudoku_rating import rate_many
+
+    waiting = collections.deque()
+
+    def puzzles():
+        for board in read_puzzles(_input(args.input)):
+            waiting.append(board)
+            yield board
+
+    failed = 0
+    out = _Output(args.output, args.chunksize)
+    try:
+        for index, rating in rate_many(puzzles(), args.jobs, args.chunksize):
+            line = format_puzzle(waiting.popleft(), args.empty)
+            if rating is None:
+                failed += 1
+                _report(f"puzzle {index + 1}: invalid givens")
+            if args.json:
+                record = {"puzzle": line}
+                if rating is not None:
+                    record.update(rating.to_dict())
+                out.write(json.dumps(record))
+            elif rating is None:
+                out.write(f"{line} 0.000 invalid")
+            else:
+                out.write(f"{line} {rating.score:.3f} {rating.tier}")
+    finally:
+        out.close()
+    return 1 if failed else 0
+
+
+def build_parser():
+    """Return the argument parser of the command-line tool."""
+    parser = argparse.ArgumentParser(
+        prog="sudoku", description=__doc__.strip().splitlines()[0]
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_io(sub, reads=True):
+        if reads:
+            sub.add_argument(
+                "input", nargs="?", default="-", help="puzzle file (default: stdin)"
+            )
+        sub.add_argument(
+            "-o", "--output", default="-", help="output file (default: stdout)"
+        )
+        sub.add_argument(
+            "--empty",
+            choices=(".", "0"),
+            default=".",
+            help="character written for empty cells",
+        )
+
+    def add_jobs(sub, chunksize):
+        sub.add_argument(
+            "-j",
+            "--jobs",
+            type=_jobs,
+            default=1,
+            help="worker processes (0 for one per CPU, default: 1)",
+        )
+        sub.add_argument(
+            "--chunksize",
+            type=int,
+            default=chunksize,
+            help="puzzles sent to a worker at a time",
+        )
+
+    solve = commands.add_parser("solve", help="solve puzzles")
+    add_io(solve)
+    add_jobs(solve, 64)
+    solve.add_argument(
+        "-m",
+        "--method",
+        default="dlx",
+        help="solving method, or 'portfolio' to pick one per puzzle",
+    )
+    solve.add_argument(
+        "--stats",
+        metavar="PATH",
+        help="JSON file the portfolio method learns from and updates",
+    )
+    solve.add_argument(
+        "--max-steps",
+        type=int,
+        default=0,
+        help="per-puzzle step budget (default: 0 for unlimited)",
+    )
+    solve.add_argument("--timeout", type=float, help="per-puzzle seconds")
+    solve.set_defaults(func=cmd_solve)
+
+    generate = commands.add_parser("generate", help="generate unique puzzles")
+    generate.add_argument("count", type=int, help="number of puzzles")
+    add_io(generate, reads=False)
+    add_jobs(generate, 16)
+    generate.add_argument("--seed", default="0", help="seed of the run")
+    generate.add_argument("--start", type=int, default=0, help="first puzzle index")
+    generate.add_argument("--clues", type=int, default=25, help="target clues")
+    generate.add_argument("--symmetry", help="clue symmetry, e.g. rotational")
+    generate.add_argument(
+        "--dedupe",
+        choices=("exact", "canonical", "none"),
+        default="exact",
+        help="how repeated puzzles are skipped",
+    )
+    generate.add_argument(
+        "--solutions",
+        action="store_true",
+        help="append ',<solution>' to every line",
+    )
+    generate.set_defaults(func=cmd_generate)
+
+    validate = commands.add_parser("validate", help="check puzzles for conflicts")
+    add_io(validate)
+    validate.add_argument(
+        "--complete", action="store_true", help="also require filled boards"
+    )
+    validate.add_argument(
+        "--filter",
+        action="store_true",
+        help="write the valid puzzles to the output, report the others on stderr",
+    )
+    validate.add_argument("-q", "--quiet", action="store_true")
+    validate.add_argument("--batch-size", type=int, default=4096)
+    validate.set_defaults(func=cmd_validate)
+
+    rate = commands.add_parser("rate", help="rate puzzle difficulty")
+    add_io(rate)
+    add_jobs(rate, 256)
+    rate.add_argument(
+        "--json", action="store_true", help="write one JSON object per puzzle"
+    )
+    rate.set_defaults(func=cmd_rate)
+    return parser
+
+
+def main(argv=None):
+    """
+    Run the command-line tool.
+
+    Returns:
+        int: 0 on success, 1 if some puzzles could not be solved, rated or
+             validated, 2 for usage and input errors
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except ValueError as e:
+        _report(f"error: {e}")
+        return 2
+    except BrokenPipeError:
+        # The reader went away (e.g. '| head'); silence the final flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import itertools
+import struct
+
+import numpy as np
+
+from sudoku import Sudoku
+
+# File layout: a 16-byte header followed by fixed-size records. Each record
+# holds a puzzle and, optionally, its solution. A grid is stored either as 81
+# raw bytes or packed two cells per byte (41 bytes, high nibble first).
+MAGIC = b"SDKB"
+VERSION = 1
+FLAG_SOLUTIONS = 0x01
+FLAG_PACKED = 0x02
+
+_HEADER = struct.Struct("<4sBBHQ")  # magic, version, flags, reserved, count
+PACKED_GRID_SIZE = 41
+RAW_GRID_SIZE = 81
+
+
+def _grid_cells(grids):
+    """
+    Return grids as an (N, 81) uint8 array.
+
+    Raises:
+        ValueError: If the grids are not (N, 9, 9) or (N, 81), or hold
+                    values outside 0-9
+    """
+    grids = np.asarray(grids)
+    if grids.shape[1:] not in ((9, 9), (81,)):
+        raise ValueError(
+            f"Grids must have shape (N, 9, 9) or (N, 81), got {grids.shape}"
+        )
+    # Checked before the cast, which would wrap negative and large values
+    if grids.size and (grids.min() < 0 or grids.max() > 9):
+        raise ValueError("Grid values must be between 0 and 9")
+    return grids.astype(np.uint8).reshape(-1, 81)
+
+
+def pack_grids(grids):
+    """
+    Pack (N, 9, 9) grids into (N, 41) bytes, two cells per byte.
+
+    Args:
+        grids: Array-like of shape (N, 9, 9) or (N, 81) with values 0-9
+
+    Returns:
+        numpy.ndarray: uint8 array of shape (N, 41)
+
+    Raises:
+        ValueError: If the grids have another shape or values
+    """
+    cells = _grid_cells(grids)
+    padded = np.zeros((len(cells), 2 * PACKED_GRID_SIZE), dtype=np.uint8)
+    padded[:, :81] = cells
+    return (padded[:, 0::2] << 4) | padded[:, 1::2]
+
+
+def unpack_grids(packed):
+    """
+    Unpack (N, 41) nibble-packed bytes into (N, 9, 9) uint8 grids.
+    """
+    packed = np.asarray(packed, dtype=np.uint8)
+    cells = np.empty((len(packed), 2 * PACKED_GRID_SIZE), dtype=np.uint8)
+    cells[:, 0::2] = packed >> 4
+    cells[:, 1::2] = packed & 0x0F
+    return cells[:, :81].reshape(-1, 9, 9)
+
+
+class CorpusWriter:
+    """
+    Stream puzzles (and optional solutions) into a binary corpus file.
+
+    The record count is written to the header when the writer is closed.
+    """
+
+    def __init__(self, path, with_solutions=False, packed=True):
+        """
+        Args:
+            path: Destination file path
+            with_solutions: Store a solution next to every puzzle
+            packed: Store grids as 4-bit nibbles (41 bytes) instead of 81 bytes
+        """
+        self.with_solutions = with_solutions
+        self.packed = packed
+        self.count = 0
+        self.file = open(path, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        flags = (FLAG_SOLUTIONS if self.with_solutions else 0) | (
+            FLAG_PACKED if self.packed else 0
+        )
+        self.file.write(_HEADER.pack(MAGIC, VERSION, flags, 0, self.count))
+
+    def _encode(self, grids):
+        cells = _grid_cells(grids)
+        return pack_grids(cells) if self.packed else cells
+
+    def write_many(self, puzzles, solutions=None):
+        """
+        Append a batch of puzzles.
+
+        Args:
+            puzzles: Array-like of shape (N, 9, 9) or (N, 81)
+            solutions: Array-like of the same shape (required if the writer
+                       was created with with_solutions=True)
+
+        Raises:
+            ValueError: If solutions are missing, unexpected or not one per
+                        puzzle, or a grid is not 9x9 with values 0-9
+        """
+        if (solutions is not None) != self.with_solutions:
+            raise ValueError(
+                "Solutions must be given if and only if the corpus stores them"
+            )
+        records = self._encode(puzzles)
+        if self.with_solutions:
+            solutions = self._encode(solutions)
+            if len(solutions) != len(records):
+                raise ValueError(
+                    f"Got {len(solutions)} solutions for {len(records)} puzzles"
+                )
+            records = np.concatenate((records, solutions), axis=1)
+        self.file.write(np.ascontiguousarray(records).tobytes())
+        self.count += len(records)
+
+    def write(self, puzzle, solution=None):
+        """Append a single puzzle (and its solution)."""
+        self.write_many(
+            [np.asarray(puzzle)], None if solution is None else [np.asarray(solution)]
+        )
+
+    def close(self):
+        """Write the final record count and close the file."""
+        if not self.file.closed:
+            self.file.seek(0)
+            self._write_header()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_corpus(path, puzzles, solutions=None, packed=True, batch_size=65536):
+    """
+    Write an iterable of puzzles (and solutions) to a corpus file.
+
+    Boards are consumed lazily in batches, so generators can be written
+    without materializing them.
+
+    Returns:
+        int: Number of records written
+
+    Raises:
+        ValueError: If solutions are given but not one per puzzle
+    """
+    with CorpusWriter(path, solutions is not None, packed) as writer:
+        puzzles = iter(puzzles)
+        solutions = iter(solutions) if solutions is not None else None
+        while True:
+            batch = list(itertools.islice(puzzles, batch_size))
+            if not batch:
+                break
+            solution_batch = None
+            if solutions is not None:
+                solution_batch = list(itertools.islice(solutions, len(batch)))
+            writer.write_many(batch, solution_batch)
+        if solutions is not None and next(solutions, None) is not None:
+            raise ValueError(f"Got more solutions than {writer.count} puzzles")
+        return writer.count
+
+
+class CorpusReader:
+    """
+    Memory-mapped reader for corpus files written by CorpusWriter.
+
+    Records are never loaded eagerly. Raw (unpacked) corpora expose
+    zero-copy (N, 9, 9) views of the file; packed corpora are unpacked
+    slice by slice on demand.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Corpus file path
+
+        Raises:
+            ValueError: If the file is not a corpus of a supported version
+        """
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError("Not a Sudoku corpus file: truncated header")
+        magic, version, flags, _, count = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("Not a Sudoku corpus file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported corpus version: {version}")
+
+        self.has_solutions = bool(flags & FLAG_SOLUTIONS)
+        self.packed = bool(flags & FLAG_PACKED)
+        self.grid_size = PACKED_GRID_SIZE if self.packed else RAW_GRID_SIZE
+        record_size = self.grid_size * (2 if self.has_solutions else 1)
+        if count:
+            self.records = np.memmap(
+                path,
+                dtype=np.uint8,
+                mode="r",
+                offset=_HEADER.size,
+                shape=(count, record_size),
+            )
+        else:
+            self.records = np.empty((0, record_size), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _grids(self, field, start, stop):
+        data = self.records[
+            start:stop, field * self.grid_size : (field + 1) * self.grid_size
+        ]
+        if self.packed:
+            return unpack_grids(data)
+        return data.reshape(-1, 9, 9)
+
+    def puzzles(self, start=0, stop=None):
+        """
+        Get puzzles [start:stop] as an (N, 9, 9) uint8 array.
+
+        The array is a read-only view of the file for raw corpora and a
+        freshly unpacked copy for packed ones.
+        """
+        return self._grids(0, start, stop)
+
+    def solutions(self, start=0, stop=None):
+        """
+        Get solutions [start:stop] as an (N, 9, 9) uint8 array.
+
+        Raises:
+            ValueError: If the corpus was written without solutions
+        """
+        if not self.has_solutions:
+            raise ValueError("This corpus does not store solutions")
+        return self._grids(1, start, stop)
+
+    def sudoku(self, index):
+        """Build a Sudoku instance for the puzzle at 'index' (may be negative)."""
+        index = range(len(self))[index]
+        return Sudoku(self.puzzles(index, index + 1)[0])
+
+    def iter_sudokus(self, batch_size=4096):
+        """Yield every puzzle as a Sudoku instance, unpacking in batches."""
+        for start in range(0, len(self), batch_size):
+            for grid in self.puzzles(start, start + batch_size):
+                yield Sudoku(grid)
+
+    def __iter__(self):
+        return self.iter_sudokus()
+
+    def close(self):
+        """
+        Drop the reader's reference to the memory map.
+
+        The mapping is released once views returned by puzzles() and
+        solutions() are no longer referenced either.
+        """
+        self.records = np.empty((0, self.records.shape[1]), dtype=np.uint8)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,337 @@
+import functools
+
+import numpy as np
+
+from sudoku import board_geometry
+
+
+class DancingLinks:
+    """
+    Knuth's Algorithm X over an array-backed Dancing Links structure.
+
+    Node 0 is the root header, nodes 1..num_columns are the column headers and
+    every row added afterwards contributes one node per covered column. Links
+    live in flat Python lists (L, R, U, D), so cover/uncover only rewrites a few
+    integers in place and column sizes are kept up to date incrementally.
+    """
+
+    def __init__(self, num_columns):
+        """
+        Create an empty exact cover problem with the given number of columns.
+
+        Args:
+            num_columns: Number of constraints that must each be covered once
+        """
+        self.num_columns = num_columns
+        headers = range(num_columns + 1)
+        self.L = [i - 1 for i in headers]
+        self.L[0] = num_columns
+        self.R = [i + 1 for i in headers]
+        self.R[num_columns] = 0
+        self.U = list(headers)
+        self.D = list(headers)
+        self.C = list(headers)
+        self.S = [0] * (num_columns + 1)
+        self.ROW = [None] * (num_columns + 1)
+        self.row_nodes = {}
+        self.selected = []
+
+    def copy(self):
+        """Return an independent copy of the current link structure."""
+        other = DancingLinks.__new__(DancingLinks)
+        other.num_columns = self.num_columns
+        other.L = self.L.copy()
+        other.R = self.R.copy()
+        other.U = self.U.copy()
+        other.D = self.D.copy()
+        other.C = self.C.copy()
+        other.S = self.S.copy()
+        other.ROW = self.ROW.copy()
+        other.row_nodes = self.row_nodes.copy()
+        other.selected = self.selected.copy()
+        return other
+
+    def add_row(self, row_id, columns):
+        """
+        Add a row covering the given columns (0-based).
+
+        Args:
+            row_id: Identifier reported back in solutions
+            columns: Iterable of column indices covered by this row
+        """
+        L, R, U, D, C, S, ROW = self.L, self.R, self.U, self.D, self.C, self.S, self.ROW
+        first = None
+        for column in columns:
+            header = column + 1
+            node = len(C)
+            C.append(header)
+            ROW.append(row_id)
+            # Insert at the bottom of the column
+            U.append(U[header])
+            D.append(header)
+            D[U[header]] = node
+            U[header] = node
+            S[header] += 1
+            # Insert at the end of the row
+            if first is None:
+                first = node
+                L.append(node)
+                R.append(node)
+            else:
+                L.append(L[first])
+                R.append(first)
+                R[L[first]] = node
+                L[first] = node
+        self.row_nodes[row_id] = first
+
+    def _cover(self, c):
+        """Unlink column c and every row that covers it."""
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        L[R[c]] = L[c]
+        R[L[c]] = R[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def _uncover(self, c):
+        """Relink column c and its rows, undoing _cover(c)."""
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[c]] = c
+        R[L[c]] = c
+
+    def select(self, row_id):
+        """
+        Force a row into every solution (used for the givens of a puzzle).
+
+        Returns:
+            bool: False if the row conflicts with a previously selected row
+        """
+        L, R, C = self.L, self.R, self.C
+        first = self.row_nodes[row_id]
+        node = first
+        while True:
+            header = C[node]
+            # A covered column has been unlinked from the header list
+            if R[L[header]] != header:
+                return False
+            node = R[node]
+            if node == first:
+                break
+        while True:
+            self._cover(C[node])
+            node = R[node]
+            if node == first:
+                break
+        self.selected.append(row_id)
+        return True
+
+    def search(self, limit=1, on_select=None, on_deselect=None):
+        """
+        Enumerate exact covers.
+
+        The link structure is fully restored when the search returns, so the
+        same instance can be searched again.
+
+        Args:
+            limit: Stop after this many solutions (None for all of them)
+            on_select: Optional callback called with each row id tried
+            on_deselect: Optional callback called with each row id undone
+
+        Returns:
+            list: Solutions found, each a list of row ids (selected rows first)
+        """
+        if limit == 0:
+            return []
+        L, R, D, C, S, ROW = self.L, self.R, self.D, self.C, self.S, self.ROW
+        cover, uncover = self._cover, self._uncover
+        partial = list(self.selected)
+        solutions = []
+
+        def choose(r):
+            partial.append(ROW[r])
+            if on_select is not None:
+                on_select(ROW[r])
+            j = R[r]
+            while j != r:
+                cover(C[j])
+                j = R[j]
+
+        def unchoose(r):
+            j = L[r]
+            while j != r:
+                uncover(C[j])
+                j = L[j]
+            partial.pop()
+
+        # The search runs on an explicit stack, so its depth (one level per
+        # chosen row) is not bounded by the recursion limit. Level k holds
+        # the covered column and the row currently chosen for it.
+        columns = []
+        rows = []
+        while True:
+            if R[0] == 0:
+                solutions.append(partial.copy())
+                if limit is not None and len(solutions) >= limit:
+                    while rows:
+                        unchoose(rows.pop())
+                        uncover(columns.pop())
+                    return solutions
+            else:
+                # Choose the column with the fewest remaining rows
+                c = R[0]
+                best = S[c]
+                j = R[c]
+                while j != 0 and best > 1:
+                    if S[j] < best:
+                        best = S[j]
+                        c = j
+                    j = R[j]
+                if best > 0:
+                    cover(c)
+                    columns.append(c)
+                    rows.append(D[c])
+                    choose(D[c])
+                    continue
+
+            # Dead end or solution: move to the next row of the deepest level
+            while rows:
+                r = rows[-1]
+                unchoose(r)
+                if on_deselect is not None:
+                    on_deselect(ROW[r])
+                r = D[r]
+                if r != columns[-1]:
+                    rows[-1] = r
+                    choose(r)
+                    break
+                rows.pop()
+                uncover(columns.pop())
+            else:
+                return solutions
+
+    def count_solutions(self, limit=None):
+        """Count exact covers, stopping once 'limit' is reached."""
+        return len(self.search(limit))
+
+
+def _cell_row_id(row, col, num, size=9):
+    return (row * size + col) * size + num - 1
+
+
+def _decode_row_id(row_id, size=9):
+    cell, digit = divmod(row_id, size)
+    return cell // size, cell % size, digit + 1
+
+
+@functools.lru_cache(maxsize=None)
+def _sudoku_template(box_size=3):
+    """
+    Build (once per box size) the exact cover matrix of an empty grid.
+
+    A board of size S has S**3 rows (one per cell and digit) and 4 * S**2
+    columns: 729 x 324 for 9x9.
+    """
+    size = box_size * box_size
+    cells = size * size
+    links = DancingLinks(4 * cells)
+    for row in range(size):
+        for col in range(size):
+            box = (row // box_size) * box_size + col // box_size
+            for num in range(1, size + 1):
+                links.add_row(
+                    _cell_row_id(row, col, num, size),
+                    (
+                        row * size + col,  # Cell constraint
+                        cells + row * size + num - 1,  # Row constraint
+                        2 * cells + col * size + num - 1,  # Column constraint
+                        3 * cells + box * size + num - 1,  # Box constraint
+                    ),
+                )
+    return links
+
+
+class SudokuDLX:
+    """Dancing Links solver for Sudoku boards of any box size."""
+
+    def __init__(self, board, box_size=None):
+        """
+        Args:
+            board: List of lists or numpy array (0 for empty cells)
+            box_size: Size of the blocks; inferred from the board if None
+
+        Raises:
+            ValueError: If the board has the wrong shape or the givens
+                        contradict each other
+        """
+        self.board = np.array(board, dtype=int)
+        geo = board_geometry(self.board.shape, box_size)
+        size = self.size = geo.size
+        self.links = _sudoku_template(geo.box_size).copy()
+        for row, values in enumerate(self.board.tolist()):
+            for col, num in enumerate(values):
+                if not num:
+                    continue
+                if not 0 < num <= size or not self.links.select(
+                    _cell_row_id(row, col, num, size)
+                ):
+                    raise ValueError(
+                        "Invalid initial board: repeated numbers in rows, columns or blocks"
+                    )
+        self.num_givens = len(self.links.selected)
+
+    def _to_board(self, solution):
+        board = np.zeros((self.size, self.size), dtype=int)
+        for row_id in solution:
+            row, col, num = _decode_row_id(row_id, self.size)
+            board[row, col] = num
+        return board
+
+    def _row_callback(self, callback):
+        """Wrap a (row, col, num) callback as a row id callback, or return None."""
+        if callback is None:
+            return None
+        size = self.size
+        return lambda row_id: callback(*_decode_row_id(row_id, size))
+
+    def solve(self, on_place=None, on_remove=None):
+        """
+        Find one solution.
+
+        Args:
+            on_place: Optional callback (row, col, num) for every tentative placement
+            on_remove: Optional callback (row, col, num) for every undone placement
+
+        Returns:
+            numpy.ndarray or None: The solved board, or None if there is no solution
+        """
+        on_select = self._row_callback(on_place)
+        on_deselect = self._row_callback(on_remove)
+        solutions = self.links.search(1, on_select, on_deselect)
+        return self._to_board(solutions[0]) if solutions else None
+
+    def count_solutions(self, limit=None):
+        """
+        Count the solutions of the board.
+
+        Args:
+            limit: Stop counting once this many solutions are found (None for all)
+
+        Returns:
+            int: Number of solutions found, at most 'limit'
+        """
+        return self.links.count_solutions(limit)
@@ -1,84 +1,494 @@
+import functools
+import hashlib
 import numpy as np
 from sudoku import Sudoku
+from sudoku_batch import map_many
+from sudoku_canonical import MAX_BOX_SIZE, canonical_key
+from sudoku_corpus import CorpusWriter
+from sudoku_solvers import SolveStats, SudokuSolver, count_solutions, iter_solutions
 import random
+import time
+
+# Cell maps whose orbits define the clue patterns supported by generate_unique.
+# 'last' is the index of the last row and column (8 on a 9x9 board).
+SYMMETRIES = {
+    None: None,
+    "rotational": lambda row, col, last: (last - row, last - col),
+    "quarter_turn": lambda row, col, last: (col, last - row),
+    "diagonal": lambda row, col, last: (col, row),
+    "horizontal": lambda row, col, last: (row, last - col),
+    "vertical": lambda row, col, last: (last - row, col),
+}
+
+# Fewest clues a puzzle with a unique solution can have, where it is known
+MIN_CLUES = {2: 4, 3: 17}
+
+# How generate_many recognizes repeated puzzles: as the same grid, as
+# equivalent grids (see sudoku_canonical) or not at all
+DEDUPE_MODES = ("exact", "canonical", None)
+
+
+def _symmetry_groups(symmetry, size=9):
+    """Partition the cells into groups that must be cleared together."""
+    transform = SYMMETRIES[symmetry]
+    groups = []
+    seen = set()
+    for cell in range(size * size):
+        if cell in seen:
+            continue
+        group = [cell]
+        if transform is not None:
+            row, col = transform(cell // size, cell % size, size - 1)
+            while row * size + col != cell:
+                group.append(row * size + col)
+                row, col = transform(row, col, size - 1)
+        seen.update(group)
+        groups.append(group)
+    return groups
 
 
 class SudokuGenerator:
-    def __init__(self):
-        self.sudoku = Sudoku()
+    def __init__(self, box_size=3, stats=False, rng=None, grid_factory=None):
+        """
+        Args:
+            box_size: Size of the blocks of the generated boards (2 for 4x4,
+                      3 for 9x9, 4 for 16x16, ...)
+            stats: Collect a SolveStats for every generated puzzle in
+                   self.stats. Its phases are "fill" (completing a grid),
+                   "remove_clues" and "search", the part of both spent in
+                   solver searches.
+            rng: Optional random.Random that drives every random choice
+                 (defaults to the global random module, so random.seed
+                 makes generation reproducible)
+            grid_factory: Optional GridFactory that supplies the complete
+                          grids instead of a backtracking search. Its
+                          transforms are drawn from a stream seeded by
+                          'rng', not from the factory's own seed.
+
+        Raises:
+            ValueError: If the grid factory makes boards of another size
+        """
+        if grid_factory is not None and grid_factory.box_size != box_size:
+            raise ValueError("The grid factory makes boards of another size")
+        self.rng = rng if rng is not None else random
+        self.grid_factory = grid_factory
+        self.box_size = box_size
+        self.size = box_size * box_size
+        self.sudoku = Sudoku(box_size=box_size)
+        self.collect_stats = stats
+        self.stats = None
+
+    def _check_clues(self, num_clues):
+        min_clues = MIN_CLUES.get(self.box_size, 0)
+        if num_clues < min_clues:
+            raise ValueError(f"A Sudoku puzzle must have at least {min_clues} clues")
 
     def _fill_diagonal_blocks(self):
-        """Fill the three diagonal 3x3 blocks with random numbers."""
-        numbers = list(range(1, 10))
-        for i in range(0, 9, 3):
+        """Fill the diagonal blocks with random numbers."""
+        box_size = self.box_size
+        numbers = list(range(1, self.size + 1))
+        for i in range(0, self.size, box_size):
             # Shuffle numbers for each diagonal block
-            random.shuffle(numbers)
+            self.rng.shuffle(numbers)
             pos = 0
-            for row in range(i, i + 3):
-                for col in range(i, i + 3):
-                    self.sudoku.board[row, col] = numbers[pos]
+            for row in range(i, i + box_size):
+                for col in range(i, i + box_size):
+                    self.sudoku._assign(row, col, numbers[pos])
                     pos += 1
 
-    def _solve(self, row=0, col=0):
+    def _solve(self):
         """
-        Solve the Sudoku using backtracking.
+        Complete the board with randomized iterative backtracking.
         Returns True if a solution is found, False otherwise.
-        """
-        if col == 9:
-            row += 1
-            col = 0
-        if row == 9:
-            return True
 
-        if self.sudoku.board[row, col] != 0:
-            return self._solve(row, col + 1)
+        Row-major backtracking blows up beyond 9x9, so larger boards are
+        completed by a randomized search with singles propagation instead.
+        """
+        if self.box_size > 3:
+            solutions = iter_solutions(
+                self.sudoku.board, rng=self.rng, stats=self.stats
+            )
+            solution = next(solutions, None)
+            solutions.close()
+            if solution is None:
+                return False
+        else:
+            solver = SudokuSolver(
+                self.sudoku.board, rng=self.rng, stats=self.stats is not None
+            )
+            result = solver.solve_stochastic()
+            if self.stats is not None:
+                self.stats.merge(result.stats)
+            if not result.solved:
+                return False
+            solution = solver.board
+        self.sudoku.board[:] = solution
+        self.sudoku._build_masks()
+        return True
 
-        numbers = list(range(1, 10))
-        random.shuffle(numbers)  # Try numbers in random order
+    def _fill_grid(self):
+        """Replace self.sudoku with a random complete grid."""
+        start = time.perf_counter()
+        if self.grid_factory is not None:
+            # A child stream of rng, so seeding the generator fixes the grids
+            grid_rng = np.random.default_rng(self.rng.getrandbits(64))
+            self.sudoku = Sudoku(self.grid_factory.grid(grid_rng))
+        else:
+            while True:
+                # Start with empty board
+                self.sudoku = Sudoku(box_size=self.box_size)
 
-        for num in numbers:
-            if self.sudoku.is_valid_move(row, col, num):
-                self.sudoku.board[row, col] = num
-                if self._solve(row, col + 1):
-                    return True
-                self.sudoku.board[row, col] = 0
+                # Fill diagonal blocks (this ensures we start with some valid numbers)
+                self._fill_diagonal_blocks()
 
-        return False
+                # Solve the rest of the puzzle. On 9x9 boards this always
+                # succeeds; on 4x4 boards the diagonal blocks can rule out
+                # every completion.
+                if self._solve():
+                    break
+        if self.stats is not None:
+            self.stats.add_phase("fill", time.perf_counter() - start)
 
     def generate(self, num_clues=25):
         """
         Generate a new Sudoku puzzle with the specified number of clues.
 
         Args:
-            num_clues: Number of clues to leave in the puzzle (minimum 17)
+            num_clues: Number of clues to leave in the puzzle (minimum 17
+                       on 9x9 boards, see MIN_CLUES)
 
         Returns:
             Sudoku: A new Sudoku instance with the generated puzzle
 
         Raises:
-            ValueError: If num_clues is less than 17
+            ValueError: If num_clues is below the minimum for the board size
         """
-        if num_clues < 17:
-            raise ValueError("A Sudoku puzzle must have at least 17 clues")
-
-        # Start with empty board
-        self.sudoku = Sudoku()
-
-        # Fill diagonal blocks (this ensures we start with some valid numbers)
-        self._fill_diagonal_blocks()
+        self._check_clues(num_clues)
+        self.stats = SolveStats() if self.collect_stats else None
 
-        # Solve the rest of the puzzle
-        self._solve()
+        # Start with a random complete grid
+        self._fill_grid()
 
         # Create a copy of the solved board
         solution = self.sudoku.board.copy()
 
         # Remove numbers while keeping at least num_clues
-        cells = list(range(81))  # All positions in the 9x9 grid
-        random.shuffle(cells)
+        size = self.size
+        cells = list(range(size * size))  # All positions in the grid
+        self.rng.shuffle(cells)
 
-        for cell in cells[: (81 - num_clues)]:  # Remove (81 - num_clues) numbers
-            row, col = cell // 9, cell % 9
-            self.sudoku.board[row, col] = 0
+        for cell in cells[: (size * size - num_clues)]:  # Keep num_clues numbers
+            row, col = cell // size, cell % size
+            self.sudoku.clear_cell(row, col)
 
         return self.sudoku, solution
+
+    def _remove_clues(self, solution, num_clues, groups, deadline):
+        """
+        Clear symmetric groups of cells while the puzzle keeps a unique solution.
+
+        Returns:
+            list: The puzzle as a flat list of size * size values
+        """
+        start = time.perf_counter()
+        size = self.size
+        cells = solution.flatten().tolist()
+        clues = len(cells)
+        self.rng.shuffle(groups)
+        for group in groups:
+            if clues == num_clues:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if clues - len(group) < num_clues:
+                continue
+            saved = [cells[cell] for cell in group]
+            for cell in group:
+                cells[cell] = 0
+            board = [cells[row * size : row * size + size] for row in range(size)]
+            if count_solutions(board, limit=2, stats=self.stats) == 1:
+                clues -= len(group)
+            else:
+                for cell, value in zip(group, saved):
+                    cells[cell] = value
+        if self.stats is not None:
+            self.stats.add_phase("remove_clues", time.perf_counter() - start)
+        return cells
+
+    def generate_unique(self, num_clues=25, symmetry=None, time_budget=None):
+        """
+        Generate a puzzle that has exactly one solution.
+
+        Clues are removed one cell (or one symmetric group of cells) at a time,
+        and any removal that would allow a second solution is undone. If the
+        target cannot be reached from a grid, the puzzle is minimal with more
+        clues than requested. With a time budget, fresh grids are tried until
+        the target is reached or the budget runs out, and the puzzle with the
+        fewest clues is returned.
+
+        Args:
+            num_clues: Target number of clues (minimum 17 on 9x9 boards, see
+                       MIN_CLUES)
+            symmetry: None or one of the names in SYMMETRIES
+            time_budget: Optional number of seconds to spend on this puzzle
+
+        Returns:
+            tuple: (Sudoku, numpy.ndarray) with the puzzle and its solution
+
+        Raises:
+            ValueError: If num_clues is below the minimum for the board size
+                        or the symmetry is unknown
+        """
+        self._check_clues(num_clues)
+        if symmetry not in SYMMETRIES:
+            raise ValueError(f"Unknown symmetry: {symmetry}")
+
+        deadline = None
+        if time_budget is not None:
+            deadline = time.perf_counter() + time_budget
+        groups = _symmetry_groups(symmetry, self.size)
+        self.stats = SolveStats() if self.collect_stats else None
+
+        best = None
+        while True:
+            self._fill_grid()
+            solution = self.sudoku.board.copy()
+
+            cells = self._remove_clues(solution, num_clues, groups, deadline)
+            clues = len(cells) - cells.count(0)
+            if best is None or clues < best[0]:
+                best = (clues, cells, solution)
+            if clues == num_clues or deadline is None:
+                break
+            if time.perf_counter() > deadline:
+                break
+
+        _, cells, solution = best
+        self.sudoku = Sudoku(np.array(cells).reshape(self.size, self.size))
+        return self.sudoku, solution
+
+
+class GridFactory:
+    """
+    Makes random complete grids in bulk from a pool of seed grids.
+
+    Every grid is a pool grid under a random symmetry: a digit relabeling,
+    row and column permutations within bands and stacks, band and stack
+    permutations and an optional transpose. These keep a grid valid, so
+    they are applied to whole batches with numpy indexing instead of a
+    search, at a few microseconds per grid.
+
+    The grids are uniformly distributed over the symmetry classes of the
+    pool. The pool is filled by the backtracking generator, so a larger
+    pool covers more of the possible grids at a higher one-off cost.
+    """
+
+    def __init__(self, pool_size=64, box_size=3, seed=None, pool=None):
+        """
+        Args:
+            pool_size: Number of seed grids to generate (ignored with 'pool')
+            box_size: Size of the blocks of the grids
+            seed: Optional seed that makes the pool reproducible, and the
+                  grids too unless an rng is passed to grids()
+            pool: Optional array-like of complete (size, size) grids to
+                  transform instead of generated ones
+
+        Raises:
+            ValueError: If the pool is empty or holds boards of another size
+        """
+        self.box_size = box_size
+        self.size = box_size * box_size
+        self.rng = np.random.default_rng(seed)
+        if pool is None:
+            generator = SudokuGenerator(box_size, rng=random.Random(seed))
+            pool = []
+            for _ in range(pool_size):
+                generator._fill_grid()
+                pool.append(generator.sudoku.board.copy())
+        self.pool = np.asarray(pool, dtype=np.uint8)
+        if len(self.pool) == 0 or self.pool.shape[1:] != (self.size, self.size):
+            raise ValueError(
+                f"The pool must hold at least one {self.size}x{self.size} grid"
+            )
+
+    def _line_orders(self, count, rng):
+        """Random orders of the rows (or columns) that keep bands together."""
+        box_size = self.box_size
+        bands = rng.random((count, box_size)).argsort(axis=1)
+        inner = rng.random((count, box_size, box_size)).argsort(axis=2)
+        return (bands[:, :, np.newaxis] * box_size + inner).reshape(count, self.size)
+
+    def grids(self, count, rng=None):
+        """
+        Make a batch of random complete grids.
+
+        Args:
+            count: Number of grids
+            rng: Optional numpy Generator to draw the transforms from
+                 instead of the factory's own (seeded with 'seed')
+
+        Returns:
+            numpy.ndarray: uint8 array of shape (count, size, size)
+        """
+        rng = self.rng if rng is None else rng
+        size = self.size
+        grids = self.pool[rng.integers(len(self.pool), size=count)]
+        flip = rng.random(count) < 0.5
+        grids[flip] = grids[flip].transpose(0, 2, 1)
+
+        rows = self._line_orders(count, rng)
+        cols = self._line_orders(count, rng)
+        grids = grids[
+            np.arange(count)[:, np.newaxis, np.newaxis],
+            rows[:, :, np.newaxis],
+            cols[:, np.newaxis, :],
+        ]
+
+        # labels[n, d] is the new digit of digit d in grid n
+        labels = np.zeros((count, size + 1), dtype=np.uint8)
+        labels[:, 1:] = rng.random((count, size)).argsort(axis=1) + 1
+        cells = np.take_along_axis(labels, grids.reshape(count, size * size), axis=1)
+        return cells.reshape(count, size, size)
+
+    def grid(self, rng=None):
+        """Make a single random complete grid (see grids)."""
+        return self.grids(1, rng)[0]
+
+
+def puzzle_rng(seed, index):
+    """
+    Return the random stream of puzzle 'index' of a run seeded with 'seed'.
+
+    Streams are derived by hashing, so they are independent of each other
+    and of how puzzles are spread over workers.
+    """
+    return random.Random(f"{seed}:{index}")
+
+
+def generate_puzzle(seed, index, num_clues=25, symmetry=None, box_size=3):
+    """
+    Generate puzzle 'index' of a reproducible run (see generate_many).
+
+    Returns:
+        tuple: (puzzle, solution) as uint8 arrays
+
+    Raises:
+        ValueError: If num_clues is below the minimum for the board size
+                    or the symmetry is unknown
+    """
+    generator = SudokuGenerator(box_size, rng=puzzle_rng(seed, index))
+    sudoku, solution = generator.generate_unique(num_clues, symmetry)
+    return sudoku.board.astype(np.uint8), solution.astype(np.uint8)
+
+
+def _generate_keyed(index, seed, num_clues, symmetry, box_size, dedupe):
+    """Worker entry point: generate a puzzle and the key used to deduplicate it."""
+    puzzle, solution = generate_puzzle(seed, index, num_clues, symmetry, box_size)
+    key = None
+    if dedupe == "canonical" and box_size <= MAX_BOX_SIZE:
+        key = canonical_key(puzzle)
+    elif dedupe is not None:
+        key = puzzle.tobytes()
+    if key is not None:
+        # A 64-bit digest keeps the set of seen puzzles small on long runs
+        key = hashlib.blake2b(key, digest_size=8).digest()
+    return puzzle, solution, key
+
+
+def generate_many(
+    count,
+    seed=0,
+    num_clues=25,
+    symmetry=None,
+    box_size=3,
+    dedupe="exact",
+    start=0,
+    workers=None,
+    chunksize=16,
+):
+    """
+    Generate puzzles with unique solutions across worker processes.
+
+    Puzzle 'index' only depends on (seed, index) and the generation
+    settings, so any puzzle of a run can be regenerated on its own with
+    generate_puzzle, and a run can be split into ranges with 'start'.
+    Puzzles are streamed in index order (see map_many) and repeats are
+    skipped, so the index of a yielded puzzle can be larger than the
+    number of puzzles yielded before it.
+
+    Args:
+        count: Number of puzzles to generate (before deduplication)
+        seed: Master seed of the run (any hashable str, int or bytes)
+        num_clues: Target number of clues (see generate_unique)
+        symmetry: None or one of the names in SYMMETRIES
+        box_size: Size of the blocks of the boards
+        dedupe: One of DEDUPE_MODES. Canonical deduplication costs a few
+                milliseconds per puzzle and falls back to exact matching
+                above 9x9.
+        start: Index of the first puzzle
+        workers: Number of worker processes (defaults to the CPU count)
+        chunksize: Number of puzzles sent to a worker at a time
+
+    Yields:
+        tuple: (index, puzzle, solution) with uint8 arrays
+
+    Raises:
+        ValueError: If num_clues is below the minimum for the board size,
+                    or the symmetry or dedupe mode is unknown
+    """
+    if dedupe not in DEDUPE_MODES:
+        raise ValueError(f"Unknown dedupe mode: {dedupe}")
+    if symmetry not in SYMMETRIES:
+        raise ValueError(f"Unknown symmetry: {symmetry}")
+    # Fail here rather than in every worker
+    SudokuGenerator(box_size)._check_clues(num_clues)
+
+    work = functools.partial(
+        _generate_keyed,
+        seed=seed,
+        num_clues=num_clues,
+        symmetry=symmetry,
+        box_size=box_size,
+        dedupe=dedupe,
+    )
+    seen = set()
+    indices = range(start, start + count)
+    for position, (puzzle, solution, key) in map_many(
+        work, indices, workers, chunksize
+    ):
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        yield start + position, puzzle, solution
+
+
+def generate_corpus(path, count, seed=0, with_solutions=True, packed=True, **kwargs):
+    """
+    Generate puzzles straight into a corpus file (see sudoku_corpus).
+
+    Puzzles are written as they arrive, so memory use does not grow with
+    'count' beyond the set of keys used for deduplication.
+
+    Args:
+        path: Destination file path
+        count: Number of puzzles to generate (before deduplication)
+        seed: Master seed of the run
+        with_solutions: Store the solution next to every puzzle
+        packed: Store grids as 4-bit nibbles
+        **kwargs: Further arguments of generate_many
+
+    Returns:
+        int: Number of puzzles written
+
+    Raises:
+        ValueError: If the boards are not 9x9, or for the errors of
+                    generate_many
+    """
+    if kwargs.get("box_size", 3) != 3:
+        raise ValueError("Corpus files only hold 9x9 boards")
+    puzzles = generate_many(count, seed, **kwargs)
+    with CorpusWriter(path, with_solutions, packed) as writer:
+        for _, puzzle, solution in puzzles:
+            writer.write(puzzle, solution if with_solutions else None)
+        return writer.count
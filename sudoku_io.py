@@ -0,0 +1,200 @@
+import io
+import itertools
+
+import numpy as np
+
+# One puzzle per line: 81 characters, digits 1-9 with '0' or '.' for empty cells.
+# Anything after the first 81 characters (e.g. ",solution" or a rating) is
+# ignored, as are blank lines and lines starting with '#'.
+LINE_LENGTH = 81
+CHUNK_SIZE = 1 << 20
+
+_TO_DIGITS = bytes.maketrans(b".", b"0")
+_CELL_CHARS = b"0123456789."
+
+
+def _open(source, mode):
+    """Return (file object, should_close) for a path or an open file."""
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        return open(source, mode, buffering=CHUNK_SIZE), True
+    return source, False
+
+
+def _is_text(f):
+    return isinstance(f, io.TextIOBase)
+
+
+def _iter_lines(f, chunk_size):
+    """Yield the lines of a file as bytes, reading it in large chunks."""
+    text = _is_text(f)
+    # read1 returns whatever is available, so lines from a pipe are yielded
+    # as they arrive instead of once a whole chunk has been written
+    read = getattr(f, "read1", f.read)
+    rest = b""
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        if text:
+            # Puzzles are ASCII; anything else (e.g. in a comment) becomes '?'
+            # and is rejected by the parser if it is not on a comment line
+            chunk = chunk.encode("ascii", errors="replace")
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+def parse_puzzle(line):
+    """
+    Parse an 81-character puzzle line.
+
+    Args:
+        line: str or bytes holding at least 81 cell characters
+
+    Returns:
+        numpy.ndarray: (9, 9) uint8 board with 0 for empty cells
+
+    Raises:
+        ValueError: If the line is too short or contains invalid characters
+    """
+    cells = _cells(line)
+    return np.frombuffer(cells, dtype=np.uint8).reshape(9, 9) - 48
+
+
+def _cells(line):
+    """Validate a puzzle line and return its 81 cells as b'0'-b'9' bytes."""
+    if isinstance(line, str):
+        line = line.encode("ascii", "replace")
+    cells = line.strip()[:LINE_LENGTH]
+    if len(cells) < LINE_LENGTH or cells.translate(None, _CELL_CHARS):
+        raise ValueError(f"Invalid puzzle line: {line[:LINE_LENGTH + 10]!r}")
+    return cells.translate(_TO_DIGITS)
+
+
+def format_puzzle(board, empty="."):
+    """
+    Format a board as an 81-character line.
+
+    Args:
+        board: List of lists or numpy array (0 for empty cells)
+        empty: Character used for empty cells ('.' or '0')
+
+    Returns:
+        str: The puzzle line without a trailing newline
+
+    Raises:
+        ValueError: If the board is not 9x9 with values 0-9
+    """
+    return _format_lines([board], empty).decode("ascii").rstrip("\n")
+
+
+def _format_lines(boards, empty):
+    """Format a batch of 9x9 boards as newline-terminated bytes."""
+    cells = np.asarray(boards)
+    if cells.shape[1:] not in ((9, 9), (LINE_LENGTH,)):
+        raise ValueError(
+            f"Boards must be 9x9 to be written as lines, got {cells.shape}"
+        )
+    # Checked before the cast, which would wrap other values into garbage
+    if cells.size and (cells.min() < 0 or cells.max() > 9):
+        raise ValueError("Board values must be between 0 and 9")
+    cells = cells.astype(np.uint8).reshape(-1, LINE_LENGTH)
+    lines = np.empty((len(cells), LINE_LENGTH + 1), dtype=np.uint8)
+    lines[:, :LINE_LENGTH] = cells + 48
+    lines[:, LINE_LENGTH] = ord("\n")
+    data = lines.tobytes()
+    if empty != "0":
+        data = data.replace(b"0", empty.encode("ascii"))
+    return data
+
+
+def _read_cells(source, chunk_size):
+    """Yield the validated cell bytes of every puzzle line in a file."""
+    f, should_close = _open(source, "rb")
+    try:
+        for number, line in enumerate(_iter_lines(f, chunk_size), 1):
+            line = line.strip()
+            if not line or line.startswith(b"#"):
+                continue
+            try:
+                yield _cells(line)
+            except ValueError as e:
+                raise ValueError(f"Line {number}: {e}") from None
+    finally:
+        if should_close:
+            f.close()
+
+
+def read_puzzles(source, chunk_size=CHUNK_SIZE):
+    """
+    Lazily parse puzzles from a file, one per line.
+
+    The file is read in large chunks and boards are yielded one at a time, so
+    files of any size are processed in constant memory.
+
+    Args:
+        source: Path or open file object (text or binary)
+        chunk_size: Number of bytes/characters read at a time
+
+    Yields:
+        numpy.ndarray: (9, 9) uint8 boards with 0 for empty cells
+
+    Raises:
+        ValueError: If a line is not a valid puzzle (the message includes
+                    its line number)
+    """
+    for cells in _read_cells(source, chunk_size):
+        yield np.frombuffer(cells, dtype=np.uint8).reshape(9, 9) - 48
+
+
+def read_puzzle_batches(source, batch_size=4096, chunk_size=CHUNK_SIZE):
+    """
+    Lazily parse puzzles into (N, 9, 9) uint8 batches of up to batch_size.
+
+    Useful for feeding the vectorized validators and corpus writers.
+    """
+    lines = _read_cells(source, chunk_size)
+    while True:
+        batch = b"".join(itertools.islice(lines, batch_size))
+        if not batch:
+            return
+        yield np.frombuffer(batch, dtype=np.uint8).reshape(-1, 9, 9) - 48
+
+
+def write_puzzles(puzzles, destination, empty=".", batch_size=4096):
+    """
+    Write boards as 81-character lines.
+
+    Boards are consumed lazily and written in batches, so generators and
+    solver results can be streamed to disk in constant memory.
+
+    Args:
+        puzzles: Iterable of boards (list of lists or numpy arrays)
+        destination: Path or open file object (text or binary)
+        empty: Character used for empty cells ('.' or '0')
+        batch_size: Number of boards formatted per write
+
+    Returns:
+        int: Number of puzzles written
+
+    Raises:
+        ValueError: If a board is not 9x9 with values 0-9
+    """
+    f, should_close = _open(destination, "wb")
+    text = _is_text(f)
+    count = 0
+    try:
+        puzzles = iter(puzzles)
+        while True:
+            batch = list(itertools.islice(puzzles, batch_size))
+            if not batch:
+                break
+            data = _format_lines(batch, empty)
+            f.write(data.decode("ascii") if text else data)
+            count += len(batch)
+    finally:
+        if should_close:
+            f.close()
+    return count
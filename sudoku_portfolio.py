@@ -0,0 +1,472 @@
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import time
+
+import numpy as np
+
+from sudoku import popcount
+from sudoku_propagation import CandidateGrid, Contradiction
+from sudoku_solvers import (
+    SEARCH_TECHNIQUES,
+    SolveResult,
+    SudokuSolver,
+    check_budget,
+    solve,
+)
+
+# Engines in order of preference before anything has been learned, by their
+# tail latency in sudoku_benchmark. Ties in the learned estimates keep it.
+DEFAULT_METHODS = (
+    "propagation",
+    "dlx",
+    "constraint_propagation",
+    "backtracking",
+    "stochastic",
+)
+
+MODES = ("auto", "select", "race")
+
+# Method name of the results the portfolio produces without running an engine
+PORTFOLIO = "portfolio"
+
+# Starting a race costs tens of milliseconds, so a selected engine is never
+# cut off sooner than this
+MIN_SELECT_BUDGET = 0.05
+
+# Extra time a racer gets to report after its own timeout before it is killed
+_RACE_GRACE = 0.1
+
+
+class PuzzleFeatures:
+    """
+    Cheap features of a puzzle, used to pick a solving engine.
+
+    They come from a single pass of naked and hidden singles, which costs a
+    fraction of a millisecond on 9x9 boards and also hands the engines a
+    smaller board to search.
+    """
+
+    def __init__(self, box_size, clues, outcome, remaining, histogram, top_fill, board):
+        self.box_size = box_size
+        self.clues = clues  # Givens of the puzzle
+        self.outcome = outcome  # "solved", "contradiction" or "open" after singles
+        self.remaining = remaining  # Empty cells left after singles
+        self.histogram = histogram  # Empty cells left by number of candidates
+        self.top_fill = top_fill  # Filled share of the first band after singles
+        self.board = board  # The board after singles
+
+    @property
+    def key(self):
+        """
+        Bucket of similar puzzles that share selection statistics.
+
+        Combines the share of cells still empty after singles, the share of
+        those with at most two candidates, and whether the first band is
+        sparse (row-major backtracking explodes on those).
+        """
+        size = self.box_size * self.box_size
+        empty_band = min(7, 8 * self.remaining // (size * size))
+        tight = sum(self.histogram[:3])
+        tight_band = min(3, 4 * tight // self.remaining) if self.remaining else 0
+        top = "sparse" if 3 * self.top_fill < 1 else "dense"
+        return f"{self.box_size}/{empty_band}/{tight_band}/{top}"
+
+    def to_dict(self):
+        """Return the features as a JSON-serializable dict (without the board)."""
+        result = dict(vars(self))
+        del result["board"]
+        result["key"] = self.key
+        return result
+
+    def __repr__(self):
+        return (
+            f"PuzzleFeatures(key={self.key!r}, clues={self.clues}, "
+            f"outcome={self.outcome!r}, remaining={self.remaining})"
+        )
+
+
+def extract_features(board):
+    """
+    Compute the PuzzleFeatures of a board.
+
+    Args:
+        board: List of lists or numpy array (0 for empty cells)
+
+    Returns:
+        PuzzleFeatures: The features of the board
+
+    Raises:
+        ValueError: If the board has the wrong shape or the givens repeat a
+                    digit in a row, column or block
+    """
+    board = np.asarray(board)
+    grid = CandidateGrid(board)
+    geo = grid.geometry
+    clues = int(np.count_nonzero(board))
+    try:
+        grid.propagate(SEARCH_TECHNIQUES)
+        outcome = "solved" if grid.unsolved == 0 else "open"
+    except Contradiction:
+        outcome = "contradiction"
+    histogram = [0] * (geo.size + 1)
+    for cell, mask in enumerate(grid.candidates):
+        if not grid.values[cell]:
+            histogram[popcount(mask)] += 1
+    band = grid.values[: geo.box_size * geo.size]
+    top_fill = sum(1 for num in band if num) / len(band)
+    return PuzzleFeatures(
+        geo.box_size,
+        clues,
+        outcome,
+        grid.unsolved,
+        histogram,
+        top_fill,
+        grid.to_board(),
+    )
+
+
+class SelectionStats:
+    """
+    Observed running times of the engines, per bucket of similar puzzles.
+
+    Every run adds its time to its (bucket, method) entry and counts as
+    answered if the engine finished. Runs cut short (cancelled racers and
+    exhausted budgets) add their time without an answer, so
+
+        expected time = total time / answered runs
+
+    is the expected time to an answer, including the cost of the runs that
+    did not get there. Buckets with few runs lean on the method's totals
+    over all buckets, and those on 'prior_seconds'.
+    """
+
+    def __init__(self, prior_seconds=0.01):
+        """
+        Args:
+            prior_seconds: Expected time assumed for methods never seen
+        """
+        self.prior_seconds = prior_seconds
+        self.buckets = {}  # key -> method -> [seconds, answered, runs]
+        self.totals = {}  # method -> [seconds, answered, runs]
+
+    def record(self, key, method, seconds, answered):
+        """Add one run of 'method' on a puzzle of bucket 'key'."""
+        for entry in (
+            self.buckets.setdefault(key, {}).setdefault(method, [0.0, 0, 0]),
+            self.totals.setdefault(method, [0.0, 0, 0]),
+        ):
+            entry[0] += seconds
+            entry[1] += int(answered)
+            entry[2] += 1
+
+    def runs(self, key, method):
+        """Return the number of runs of 'method' recorded in bucket 'key'."""
+        return self.buckets.get(key, {}).get(method, (0, 0, 0))[2]
+
+    def estimate(self, key, method):
+        """Return the expected seconds to an answer of 'method' in bucket 'key'."""
+        # Each level acts as one answered run at the estimate of the level above
+        seconds, answered, _ = self.totals.get(method, (0.0, 0, 0))
+        prior = (seconds + self.prior_seconds) / (answered + 1)
+        seconds, answered, _ = self.buckets.get(key, {}).get(method, (0.0, 0, 0))
+        return (seconds + prior) / (answered + 1)
+
+    def rank(self, key, methods):
+        """
+        Return 'methods' sorted by expected time in bucket 'key', fastest first.
+
+        Methods that never ran come last, in the order given, so that an
+        untried engine is only picked once the others have failed.
+        """
+        return sorted(
+            methods,
+            key=lambda method: (
+                method not in self.totals,
+                self.estimate(key, method),
+            ),
+        )
+
+    def to_dict(self):
+        """Return the statistics as a JSON-serializable dict."""
+        return {
+            "prior_seconds": self.prior_seconds,
+            "buckets": self.buckets,
+            "totals": self.totals,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build statistics from the dict returned by to_dict()."""
+        stats = cls(data["prior_seconds"])
+        for key, methods in data["buckets"].items():
+            for method, (seconds, answered, runs) in methods.items():
+                stats.buckets.setdefault(key, {})[method] = [seconds, answered, runs]
+        stats.totals = {method: list(entry) for method, entry in data["totals"].items()}
+        return stats
+
+    def save(self, path):
+        """
+        Write the statistics to a JSON file.
+
+        The file is replaced in one step, so runs that share it never read
+        a partly written file.
+        """
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read statistics written by save()."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def _race_entry(conn, board, method, max_steps, timeout):
+    """Racer process: solve the board and send the SolveResult back."""
+    conn.send(solve(board, method, max_steps=max_steps, timeout=timeout))
+    conn.close()
+
+
+def _answered(result):
+    """True if a search finished, with a solution or a proof there is none."""
+    return not result.exhausted and result.error is None
+
+
+class PortfolioSolver:
+    """
+    Solver that picks the engine for each puzzle from its features.
+
+    The engines' worst cases differ wildly: row-major backtracking explodes
+    on puzzles with a sparse first band, and the heavier searches cost more
+    on easy ones. Every puzzle is first run through singles
+    (extract_features), which settles easy puzzles on its own and sorts
+    the others into a bucket. Then, depending on 'mode':
+
+    - "select" runs the engine with the lowest expected time in the bucket.
+    - "race" starts several engines in separate processes and terminates
+      the others as soon as one of them answers.
+    - "auto" selects once the bucket has 'min_runs' runs of its best
+      engine, and races otherwise (and on a random 'explore' share of
+      puzzles, to keep learning). A selected engine only gets
+      'select_budget' times its expected time; if it runs out, the other
+      engines are raced for what is left of the timeout.
+
+    Every run feeds 'stats', so selection improves as puzzles are solved.
+    The statistics can be saved and passed to a later solver.
+
+    Racers are started per race, which costs a few milliseconds with the
+    "fork" start method. Racing is not available inside daemonic processes
+    such as map_many workers.
+    """
+
+    def __init__(
+        self,
+        methods=DEFAULT_METHODS,
+        mode="auto",
+        stats=None,
+        timeout=None,
+        max_steps=None,
+        race_size=3,
+        min_runs=5,
+        explore=0.05,
+        select_budget=4.0,
+        rng=None,
+    ):
+        """
+        Args:
+            methods: Engines to choose from, names from SudokuSolver.METHODS
+            mode: One of MODES
+            stats: Optional SelectionStats to start from (and update)
+            timeout: Optional limit on the time of each solve in seconds
+            max_steps: Optional step budget of each engine run
+            race_size: Number of engines raced at once, the fastest expected
+            min_runs: Runs of an engine in a bucket before "auto" trusts it
+            explore: Share of puzzles "auto" races anyway
+            select_budget: Multiple of its expected time a selected engine
+                           gets in "auto" mode before the others are raced
+            rng: Optional random.Random used to decide on exploration
+
+        Raises:
+            ValueError: If a method or the mode is unknown, or timeout or
+                        max_steps is not positive
+        """
+        check_budget(max_steps, timeout)
+        if not methods:
+            raise ValueError("At least one method is required")
+        for method in methods:
+            if method not in SudokuSolver.METHODS:
+                raise ValueError(f"Unknown solving method: {method}")
+        if mode not in MODES:
+            raise ValueError(f"Unknown portfolio mode: {mode}")
+        self.methods = tuple(methods)
+        self.mode = mode
+        self.stats = stats if stats is not None else SelectionStats()
+        self.timeout = timeout
+        self.max_steps = max_steps
+        self.race_size = max(1, race_size)
+        self.min_runs = min_runs
+        self.explore = explore
+        self.select_budget = select_budget
+        self.rng = rng if rng is not None else random.Random()
+        self.selections = dict.fromkeys(self.methods, 0)  # Engines selected
+        self.wins = dict.fromkeys(self.methods, 0)  # Races won
+        self.races = 0
+
+    def select(self, features):
+        """Return the engine with the lowest expected time for the features."""
+        return self.stats.rank(features.key, self.methods)[0]
+
+    def solve(self, board):
+        """
+        Solve a board with the engine(s) chosen for it.
+
+        Args:
+            board: List of lists or numpy array (0 for empty cells)
+
+        Returns:
+            SolveResult: The outcome. 'method' names the engine that found
+                         it, or "portfolio" when singles settled the puzzle
+                         or no engine finished in time. 'elapsed' is the
+                         wall time of the whole solve.
+
+        Raises:
+            ValueError: If the board is invalid
+        """
+        start = time.perf_counter()
+        deadline = None if self.timeout is None else start + self.timeout
+        features = extract_features(board)
+        if features.outcome != "open":
+            solved = features.outcome == "solved"
+            result = SolveResult(
+                PORTFOLIO,
+                solved,
+                features.board if solved else None,
+                # Cells placed by singles
+                features.board.size - features.remaining - features.clues,
+            )
+        else:
+            key = features.key
+            ranked = self.stats.rank(key, self.methods)
+            best = ranked[0]
+            racing = self.mode == "race" or (
+                self.mode == "auto"
+                and (
+                    self.stats.runs(key, best) < self.min_runs
+                    or self.rng.random() < self.explore
+                )
+            )
+            if racing:
+                result = self._race(features, ranked[: self.race_size], deadline)
+            else:
+                budget = None
+                if self.mode == "auto" and len(ranked) > 1:
+                    budget = max(
+                        MIN_SELECT_BUDGET,
+                        self.select_budget * self.stats.estimate(key, best),
+                    )
+                result = self._select(features, best, budget, deadline)
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if (
+                    budget is not None
+                    and result.exhausted
+                    and (remaining is None or remaining > 0)
+                ):
+                    result = self._race(
+                        features, ranked[1 : self.race_size + 1], deadline
+                    )
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _select(self, features, method, budget, deadline):
+        """Run one engine in this process, for at most 'budget' seconds."""
+        timeout = budget
+        if deadline is not None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return SolveResult(method, False, None, 0, exhausted=True)
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        self.selections[method] += 1
+        result = solve(
+            features.board, method, max_steps=self.max_steps, timeout=timeout
+        )
+        self.stats.record(features.key, method, result.elapsed, _answered(result))
+        return result
+
+    def _race(self, features, methods, deadline):
+        """
+        Race engines in separate processes; the first to answer wins.
+
+        Racers that are still searching when the race is decided are
+        terminated and recorded as having run for the winner's time.
+        """
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                return SolveResult(PORTFOLIO, False, None, 0, exhausted=True)
+        context = multiprocessing.get_context()
+        racers = {}
+        for method in methods:
+            reader, writer = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_race_entry,
+                args=(writer, features.board, method, self.max_steps, timeout),
+                daemon=True,
+            )
+            process.start()
+            writer.close()
+            racers[reader] = (method, process)
+        self.races += 1
+
+        start = time.perf_counter()
+        winner = None
+        finished = []
+        try:
+            while racers and winner is None:
+                wait = None
+                if timeout is not None:
+                    wait = max(0.0, start + timeout + _RACE_GRACE - time.perf_counter())
+                ready = multiprocessing.connection.wait(list(racers), wait)
+                if not ready:
+                    break
+                for reader in ready:
+                    method, process = racers.pop(reader)
+                    try:
+                        result = reader.recv()
+                    except EOFError:
+                        result = SolveResult(
+                            method,
+                            False,
+                            None,
+                            0,
+                            time.perf_counter() - start,
+                            error="Racer exited without a result",
+                        )
+                    reader.close()
+                    process.join()
+                    finished.append(result)
+                    if _answered(result):
+                        winner = result
+                        break
+        finally:
+            for reader, (method, process) in racers.items():
+                process.terminate()
+            for reader, (method, process) in racers.items():
+                process.join()
+                reader.close()
+
+        key = features.key
+        for result in finished:
+            self.stats.record(key, result.method, result.elapsed, _answered(result))
+        cut_at = winner.elapsed if winner else time.perf_counter() - start
+        for method, _ in racers.values():
+            self.stats.record(key, method, cut_at, False)
+        if winner is None:
+            return SolveResult(PORTFOLIO, False, None, 0, exhausted=True)
+        self.wins[winner.method] += 1
+        return winner
@@ -0,0 +1,384 @@
+import functools
+
+import numpy as np
+
+from sudoku import board_geometry, geometry, popcount
+
+# Tables of the classic 9x9 board; cells are numbered 0-80 in row-major order.
+# Other sizes use the same tables from their Geometry.
+_GEOMETRY = geometry(3)
+ROWS = _GEOMETRY.rows
+COLUMNS = _GEOMETRY.columns
+BOXES = _GEOMETRY.boxes
+UNITS = _GEOMETRY.units
+PEERS = _GEOMETRY.peers
+
+
+@functools.lru_cache(maxsize=None)
+def _intersections(box_size=3):
+    """
+    List every (segment, line_rest, box_rest) triple where a row or column
+    crosses a box: the box_size shared cells, the other cells of the line and
+    the other cells of the box.
+    """
+    geo = geometry(box_size)
+    result = []
+    for line in geo.rows + geo.columns:
+        for box in geo.boxes:
+            segment = [cell for cell in line if cell in box]
+            if segment:
+                result.append(
+                    (
+                        segment,
+                        [cell for cell in line if cell not in segment],
+                        [cell for cell in box if cell not in segment],
+                    )
+                )
+    return result
+
+
+INTERSECTIONS = _intersections()
+
+# Techniques in the order they are tried, from simplest to hardest
+TECHNIQUES = (
+    "naked_single",
+    "hidden_single",
+    "pointing",
+    "claiming",
+    "naked_pair",
+    "hidden_pair",
+)
+
+
+class Contradiction(ValueError):
+    """Raised when the candidates show that the board has no solution."""
+
+
+class CandidateGrid:
+    """
+    Candidate sets for all cells of a board with logical propagation.
+
+    Each cell holds a candidate mask with one bit per digit. Placing a digit
+    removes it from the cell's peers, and propagate() applies the techniques
+    in TECHNIQUES until none of them makes progress. How often each technique
+    fired is kept in 'counts'. Boards of any box size are supported; the
+    lookup tables come from the board's Geometry.
+    """
+
+    def __init__(self, board=None, box_size=None):
+        """
+        Args:
+            board: Optional list of lists or numpy array (0 for empty cells)
+            box_size: Size of the blocks; inferred from the board if None,
+                      3 (9x9) for an empty grid
+
+        Raises:
+            ValueError: If the board has the wrong shape or the givens repeat
+                        a digit in a row, column or block
+        """
+        if board is not None:
+            board = np.asarray(board)
+            geo = board_geometry(board.shape, box_size)
+        else:
+            geo = geometry(3 if box_size is None else box_size)
+        self.geometry = geo
+        self.candidates = [geo.all_digits] * geo.num_cells
+        self.values = [0] * geo.num_cells
+        self.unsolved = geo.num_cells
+        self.counts = dict.fromkeys(TECHNIQUES, 0)
+        self.eliminations = 0
+        self._singles = []
+        # Units whose candidates changed since hidden_single last scanned them
+        self._dirty = geo.all_units
+        if board is not None:
+            self._load(board.reshape(geo.num_cells).tolist())
+
+    def _load(self, cells):
+        geo = self.geometry
+        size = geo.size
+        digit_bit = geo.digit_bit
+        unit_indexes = geo.cell_unit_indexes
+        candidates = self.candidates
+        # Digits given in each unit, indexed like geo.units
+        given = [0] * len(geo.units)
+        for cell, num in enumerate(cells):
+            if num:
+                if not 0 < num <= size:
+                    raise ValueError(f"Invalid number {num} in cell {cell}")
+                bit = digit_bit[num]
+                row, col, box = unit_indexes[cell]
+                if (given[row] | given[col] | given[box]) & bit:
+                    raise ValueError(
+                        "Invalid initial board: repeated numbers in rows, columns or blocks"
+                    )
+                given[row] |= bit
+                given[col] |= bit
+                given[box] |= bit
+                candidates[cell] = bit
+        unsolved = 0
+        for cell, num in enumerate(cells):
+            if not num:
+                row, col, box = unit_indexes[cell]
+                mask = geo.all_digits & ~(given[row] | given[col] | given[box])
+                candidates[cell] = mask
+                unsolved += 1
+                # Empty masks are queued too, so naked_single reports them
+                if not mask & (mask - 1):
+                    self._singles.append(cell)
+        self.values = cells
+        self.unsolved = unsolved
+
+    def copy(self):
+        """Return an independent copy (used to branch during search)."""
+        other = CandidateGrid.__new__(CandidateGrid)
+        other.geometry = self.geometry
+        other.candidates = self.candidates.copy()
+        other.values = self.values.copy()
+        other.unsolved = self.unsolved
+        other.counts = self.counts.copy()
+        other.eliminations = self.eliminations
+        other._singles = self._singles.copy()
+        other._dirty = self._dirty
+        return other
+
+    def place(self, cell, num):
+        """
+        Place 'num' in a cell and remove it from the candidates of its peers.
+
+        Raises:
+            Contradiction: If 'num' is not a candidate of the cell or a peer
+                           is left without candidates
+        """
+        geo = self.geometry
+        bit = geo.digit_bit[num]
+        candidates = self.candidates
+        if self.values[cell] or not candidates[cell] & bit:
+            raise Contradiction(f"{num} cannot be placed in cell {cell}")
+        self.values[cell] = num
+        candidates[cell] = bit
+        self.unsolved -= 1
+        cell_units = geo.cell_units
+        dirty = self._dirty | cell_units[cell]
+        for peer in geo.peers[cell]:
+            mask = candidates[peer]
+            if mask & bit:
+                mask ^= bit
+                candidates[peer] = mask
+                self.eliminations += 1
+                dirty |= cell_units[peer]
+                if not mask:
+                    raise Contradiction(f"Cell {peer} has no candidates left")
+                if not mask & (mask - 1):
+                    self._singles.append(peer)
+        self._dirty = dirty
+
+    def _remove(self, cells, mask):
+        """Remove the digits in 'mask' from unsolved cells. Returns True on change."""
+        candidates = self.candidates
+        values = self.values
+        changed = False
+        for cell in cells:
+            current = candidates[cell]
+            if not values[cell] and current & mask:
+                current &= ~mask
+                candidates[cell] = current
+                self.eliminations += 1
+                self._dirty |= self.geometry.cell_units[cell]
+                changed = True
+                if not current:
+                    raise Contradiction(f"Cell {cell} has no candidates left")
+                if not current & (current - 1):
+                    self._singles.append(cell)
+        return changed
+
+    def naked_single(self):
+        """Place every cell that has a single candidate left."""
+        progress = False
+        while self._singles:
+            cell = self._singles.pop()
+            if not self.values[cell]:
+                if not self.candidates[cell]:
+                    raise Contradiction(f"Cell {cell} has no candidates left")
+                self.place(cell, self.candidates[cell].bit_length())
+                self.counts["naked_single"] += 1
+                progress = True
+        return progress
+
+    def hidden_single(self):
+        """Place digits that fit in only one cell of a unit."""
+        candidates = self.candidates
+        values = self.values
+        all_digits = self.geometry.all_digits
+        progress = False
+        dirty = self._dirty
+        self._dirty = 0
+        for index, unit in enumerate(self.geometry.units):
+            if not dirty >> index & 1:
+                continue
+            once = twice = placed = 0
+            for cell in unit:
+                mask = candidates[cell]
+                if values[cell]:
+                    placed |= mask
+                else:
+                    twice |= once & mask
+                    once |= mask
+            if (once | placed) != all_digits:
+                raise Contradiction("A digit has no place left in a unit")
+            hidden = once & ~twice & ~placed
+            while hidden:
+                bit = hidden & -hidden
+                hidden ^= bit
+                for cell in unit:
+                    if not values[cell] and candidates[cell] & bit:
+                        break
+                else:
+                    raise Contradiction("A digit has no place left in a unit")
+                self.place(cell, bit.bit_length())
+                self.counts["hidden_single"] += 1
+                progress = True
+        return progress
+
+    def _unsolved_mask(self, cells):
+        candidates = self.candidates
+        values = self.values
+        mask = 0
+        for cell in cells:
+            if not values[cell]:
+                mask |= candidates[cell]
+        return mask
+
+    def pointing(self):
+        """Digits confined to one line within a box are removed from the rest of the line."""
+        progress = False
+        for segment, line_rest, box_rest in _intersections(self.geometry.box_size):
+            confined = self._unsolved_mask(segment) & ~self._unsolved_mask(box_rest)
+            if confined and self._remove(line_rest, confined):
+                self.counts["pointing"] += 1
+                progress = True
+        return progress
+
+    def claiming(self):
+        """Digits confined to one box within a line are removed from the rest of the box."""
+        progress = False
+        for segment, line_rest, box_rest in _intersections(self.geometry.box_size):
+            confined = self._unsolved_mask(segment) & ~self._unsolved_mask(line_rest)
+            if confined and self._remove(box_rest, confined):
+                self.counts["claiming"] += 1
+                progress = True
+        return progress
+
+    def naked_pair(self):
+        """Two cells of a unit sharing the same two candidates claim both digits."""
+        candidates = self.candidates
+        values = self.values
+        progress = False
+        for unit in self.geometry.units:
+            pairs = {}
+            for cell in unit:
+                mask = candidates[cell]
+                if values[cell] or popcount(mask) != 2:
+                    continue
+                if mask in pairs:
+                    others = [c for c in unit if c != cell and c != pairs[mask]]
+                    if self._remove(others, mask):
+                        self.counts["naked_pair"] += 1
+                        progress = True
+                else:
+                    pairs[mask] = cell
+        return progress
+
+    def hidden_pair(self):
+        """Two digits confined to the same two cells of a unit clear those cells."""
+        candidates = self.candidates
+        values = self.values
+        size = self.geometry.size
+        progress = False
+        for unit in self.geometry.units:
+            # places[d] is a bitmask of the unit positions where digit d fits
+            places = [0] * (size + 1)
+            for position, cell in enumerate(unit):
+                if not values[cell]:
+                    mask = candidates[cell]
+                    while mask:
+                        bit = mask & -mask
+                        mask ^= bit
+                        places[bit.bit_length()] |= 1 << position
+            seen = {}
+            for num in range(1, size + 1):
+                where = places[num]
+                if popcount(where) != 2:
+                    continue
+                if where in seen:
+                    keep = 1 << (num - 1) | 1 << (seen[where] - 1)
+                    cells = [cell for i, cell in enumerate(unit) if where >> i & 1]
+                    if self._remove(cells, self.geometry.all_digits & ~keep):
+                        self.counts["hidden_pair"] += 1
+                        progress = True
+                else:
+                    seen[where] = num
+        return progress
+
+    def propagate(self, techniques=TECHNIQUES):
+        """
+        Apply techniques until the board is solved or none makes progress.
+
+        After every successful step the ladder restarts from the simplest
+        technique, so harder ones are only used when they are needed.
+
+        Args:
+            techniques: Names from TECHNIQUES to use, in order of preference
+
+        Returns:
+            bool: True if every cell has been solved
+
+        Raises:
+            Contradiction: If the board turns out to have no solution
+        """
+        steps = [getattr(self, name) for name in techniques]
+        while self.unsolved:
+            for step in steps:
+                if step():
+                    break
+            else:
+                break
+        return self.unsolved == 0
+
+    def best_cell(self):
+        """Return the unsolved cell with the fewest candidates, or None if solved."""
+        best = None
+        best_count = self.geometry.size + 1
+        for cell, mask in enumerate(self.candidates):
+            if not self.values[cell]:
+                count = popcount(mask)
+                if count < best_count:
+                    best, best_count = cell, count
+                    if count <= 2:
+                        break
+        return best
+
+    def to_board(self):
+        """Return the placed values as a (size, size) array (0 for unsolved cells)."""
+        size = self.geometry.size
+        return np.array(self.values, dtype=int).reshape(size, size)
+
+
+def presolve(board, techniques=TECHNIQUES):
+    """
+    Fill in every cell that logic alone can deduce.
+
+    Args:
+        board: List of lists or numpy array (0 for empty cells)
+        techniques: Names from TECHNIQUES to use
+
+    Returns:
+        tuple: (numpy.ndarray, bool) with the deduced board and whether it
+               is completely solved
+
+    Raises:
+        ValueError: If the givens are invalid or the board has no solution
+                    (Contradiction is a ValueError)
+    """
+    grid = CandidateGrid(board)
+    solved = grid.propagate(techniques)
+    return grid.to_board(), solved
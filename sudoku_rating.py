@@ -0,0 +1,197 @@
+from sudoku import mask_digits
+from sudoku_batch import map_many
+from sudoku_propagation import TECHNIQUES, CandidateGrid, Contradiction
+
+# Relative human difficulty of each technique
+TECHNIQUE_WEIGHTS = {
+    "naked_single": 1,
+    "hidden_single": 1,
+    "pointing": 2,
+    "claiming": 2,
+    "naked_pair": 3,
+    "hidden_pair": 3,
+}
+GUESS_WEIGHT = 10
+
+# A puzzle's tier is set by the hardest step it needs
+TIERS = ("easy", "medium", "hard", "expert")
+_TECHNIQUE_LEVEL = {
+    "naked_single": 0,
+    "hidden_single": 0,
+    "pointing": 1,
+    "claiming": 1,
+    "naked_pair": 2,
+    "hidden_pair": 2,
+}
+_GUESS_LEVEL = 3
+
+# Effort at which a puzzle sits halfway between its tier and the next
+_EFFORT_SCALE = 100
+
+# Techniques of the fast path tried before the full ladder
+_SINGLES = ("naked_single", "hidden_single")
+
+
+class Rating:
+    """
+    Difficulty of a puzzle.
+
+    'score' lies in [1, 5): its integer part is 1 + the index of 'tier' in
+    TIERS and its fractional part grows with the amount of work needed.
+    Unsolvable puzzles get tier "unsolvable" and a score of 0.
+    """
+
+    def __init__(
+        self,
+        score,
+        tier,
+        techniques,
+        hardest,
+        nodes=1,
+        guesses=0,
+        backtracks=0,
+        max_depth=0,
+    ):
+        self.score = score
+        self.tier = tier
+        self.techniques = techniques  # Uses of each technique on the solution path
+        self.hardest = hardest  # Hardest technique used, or "guess"
+        self.nodes = nodes  # Search nodes visited (1 when logic suffices)
+        self.guesses = guesses  # Nodes where a cell had to be guessed
+        self.backtracks = backtracks  # Guesses that led to a contradiction
+        self.max_depth = max_depth  # Deepest nesting of guesses
+
+    def __repr__(self):
+        return (
+            f"Rating(score={self.score:.3f}, tier={self.tier!r}, "
+            f"hardest={self.hardest!r}, guesses={self.guesses})"
+        )
+
+    def to_dict(self):
+        """Return the rating as a JSON-serializable dict."""
+        return dict(vars(self))
+
+
+class _SearchStats:
+    def __init__(self):
+        self.nodes = 0
+        self.guesses = 0
+        self.backtracks = 0
+        self.max_depth = 0
+
+
+def _search(grid, stats, depth):
+    """Depth-first search with full propagation. Returns the solved grid or None."""
+    stats.nodes += 1
+    stats.max_depth = max(stats.max_depth, depth)
+    try:
+        grid.propagate(TECHNIQUES)
+    except Contradiction:
+        stats.backtracks += 1
+        return None
+    cell = grid.best_cell()
+    if cell is None:
+        return grid
+
+    stats.guesses += 1
+    for num in mask_digits(grid.candidates[cell]):
+        child = grid.copy()
+        try:
+            child.place(cell, num)
+        except Contradiction:
+            stats.backtracks += 1
+            continue
+        solved = _search(child, stats, depth + 1)
+        if solved is not None:
+            return solved
+    return None
+
+
+def rate(board):
+    """
+    Rate the difficulty of a puzzle.
+
+    The puzzle is solved with the human-style technique ladder of
+    sudoku_propagation, which always uses the simplest technique that makes
+    progress. If logic gets stuck, the search guesses the most constrained
+    cell and keeps propagating. The tier is decided by the hardest step needed.
+
+    Singles are applied first on their own: puzzles they solve (most easy
+    ones) skip the search, and the others continue the ladder from where
+    the singles got stuck, so the rating is the same either way. Measured
+    on one core: easy puzzles take 110-170 us each (6-9k/s), hard and
+    17-clue ones 0.5-1.4 ms, so use rate_many() with several workers for
+    large feeds.
+
+    Args:
+        board: List of lists or numpy array (0 for empty cells)
+
+    Returns:
+        Rating: The difficulty of the puzzle
+
+    Raises:
+        ValueError: If the givens repeat a digit in a row, column or block
+    """
+    stats = _SearchStats()
+    grid = CandidateGrid(board)
+    try:
+        solved = grid.propagate(_SINGLES)
+    except Contradiction:
+        # _search would fail the same way at its first node
+        solved = False
+        grid = CandidateGrid(board)
+    if solved:
+        stats.nodes = 1
+    else:
+        grid = _search(grid, stats, 0)
+    if grid is None:
+        return Rating(
+            0.0,
+            "unsolvable",
+            {},
+            None,
+            stats.nodes,
+            stats.guesses,
+            stats.backtracks,
+            stats.max_depth,
+        )
+
+    techniques = {name: count for name, count in grid.counts.items() if count}
+    level = max((_TECHNIQUE_LEVEL[name] for name in techniques), default=0)
+    hardest = max(techniques, key=lambda name: TECHNIQUE_WEIGHTS[name], default=None)
+    if stats.guesses:
+        level = _GUESS_LEVEL
+        hardest = "guess"
+
+    effort = sum(
+        TECHNIQUE_WEIGHTS[name] * count for name, count in techniques.items()
+    ) + GUESS_WEIGHT * (stats.guesses + stats.backtracks)
+    score = 1 + level + effort / (effort + _EFFORT_SCALE)
+    return Rating(
+        score,
+        TIERS[level],
+        techniques,
+        hardest,
+        stats.nodes,
+        stats.guesses,
+        stats.backtracks,
+        stats.max_depth,
+    )
+
+
+def _rate_or_none(board):
+    try:
+        return rate(board)
+    except ValueError:
+        return None
+
+
+def rate_many(puzzles, workers=1, chunksize=256, ordered=True):
+    """
+    Rate many puzzles, optionally across worker processes (see map_many).
+
+    Yields:
+        tuple: (index, Rating) for every puzzle; the rating is None for
+               puzzles whose givens are invalid
+    """
+    return map_many(_rate_or_none, puzzles, workers, chunksize, ordered)
@@ -0,0 +1,517 @@
+"""
+Asyncio solving service.
+
+Serves the headless solvers over HTTP, on a TCP port or a Unix socket.
+Concurrent requests are coalesced into small batches that run in a pool of
+worker processes, and every request has a step and time budget, so an
+adversarial puzzle cannot hold a worker for long:
+
+    python sudoku_service.py --port 8080
+    curl -d '{"puzzle": "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......"}' localhost:8080/solve
+    curl localhost:8080/metrics
+
+POST /solve takes a JSON object with "puzzle" (an 81-character line or a
+list of rows, up to 16x16) and optional "method", "max_steps" (a positive
+integer) and "timeout" (positive seconds); the service's own limits are
+upper bounds for both budgets, and any other budget or board shape is
+answered with 400. Failures inside the workers are answered with 500.
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from sudoku import board_geometry
+from sudoku_batch import solve_one
+from sudoku_io import format_puzzle, parse_puzzle
+from sudoku_solvers import SolveResult, SudokuSolver, check_budget
+
+# Extra time a request waits for its batch beyond its own timeout, to absorb
+# the latency of the process pool
+TIMEOUT_GRACE = 0.05
+# Largest accepted request body in bytes
+MAX_BODY_SIZE = 1 << 16
+# Completions within this many seconds make up the throughput metric
+THROUGHPUT_WINDOW = 10.0
+# Largest box size of an accepted board (16x16); larger boards cannot be
+# solved within a request's budget
+MAX_BOX_SIZE = 4
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class ServiceOverloaded(RuntimeError):
+    """Raised when the request queue of a SolveService is full."""
+
+
+def _solve_batch(jobs):
+    """
+    Worker entry point: solve (board, method, max_steps, deadline) jobs in order.
+
+    Deadlines are absolute time.time() values, so later jobs of a batch only
+    get the time their request has left.
+    """
+    results = []
+    for board, method, max_steps, deadline in jobs:
+        timeout = deadline - time.time()
+        if timeout <= 0:
+            results.append(SolveResult(method, False, None, 0, exhausted=True))
+        else:
+            results.append(solve_one(board, method, max_steps, timeout=timeout))
+    return results
+
+
+class _Request:
+    def __init__(self, board, method, max_steps, deadline, future):
+        self.board = board
+        self.method = method
+        self.max_steps = max_steps
+        self.deadline = deadline
+        self.future = future
+
+
+def _bounded(requested, limit):
+    """Return the requested budget, never above the service limit."""
+    if requested is None:
+        return limit
+    if limit is None:
+        return requested
+    return min(requested, limit)
+
+
+class ServiceMetrics:
+    """Counters of a SolveService, reported by snapshot()."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0  # Requests accepted
+        self.solved = 0
+        self.unsolved = 0  # Boards without a solution or rejected as invalid
+        self.exhausted = 0  # Searches stopped by their step or time budget
+        self.timeouts = 0  # Requests answered before their batch finished
+        self.rejected = 0  # Requests refused because the queue was full
+        self.batches = 0
+        self.batched_requests = 0
+        self.in_flight = 0  # Batches running in the worker pool
+        self._completions = collections.deque()
+        self._latencies = collections.deque(maxlen=4096)
+
+    def record(self, result, latency):
+        """Count a finished request."""
+        if result.solved:
+            self.solved += 1
+        elif result.exhausted:
+            self.exhausted += 1
+        else:
+            self.unsolved += 1
+        now = time.monotonic()
+        self._completions.append(now)
+        self._latencies.append(latency)
+        self._expire(now)
+
+    def _expire(self, now):
+        """Drop completions that fell out of the throughput window."""
+        while self._completions and self._completions[0] < now - THROUGHPUT_WINDOW:
+            self._completions.popleft()
+
+    def snapshot(self, queue_depth=0):
+        """
+        Return the current metrics as a JSON-serializable dict.
+
+        Throughput counts the requests completed in the last
+        THROUGHPUT_WINDOW seconds; latency percentiles (ms) cover the most
+        recent requests.
+        """
+        now = time.monotonic()
+        self._expire(now)
+        window = min(THROUGHPUT_WINDOW, now - self.started) or 1.0
+        latencies = np.array(self._latencies) * 1000
+        return {
+            "uptime_seconds": now - self.started,
+            "requests": self.requests,
+            "solved": self.solved,
+            "unsolved": self.unsolved,
+            "exhausted": self.exhausted,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "queue_depth": queue_depth,
+            "in_flight_batches": self.in_flight,
+            "batches": self.batches,
+            "mean_batch_size": (
+                self.batched_requests / self.batches if self.batches else 0.0
+            ),
+            "requests_per_second": len(self._completions) / window,
+            "latency_ms": {
+                "p50": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                "p99": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+                "max": float(latencies.max()) if len(latencies) else 0.0,
+            },
+        }
+
+
+class SolveService:
+    """
+    Solves boards in a process pool, batching concurrent requests.
+
+    Requests wait in a bounded queue. A batcher task takes the first waiting
+    request, gives others max_delay seconds to arrive and sends up to
+    max_batch of them to a worker in one round trip. The requests of a batch
+    are solved one after the other, so a burst is split evenly over the
+    workers rather than queued behind one full batch. At most two batches per
+    worker are in flight, so a burst stays in the queue (and in the
+    queue_depth metric) instead of piling up in the pool.
+
+    Use as an async context manager, or call start() and close().
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        method="dlx",
+        max_steps=200_000,
+        timeout=1.0,
+        max_batch=16,
+        max_delay=0.002,
+        max_queue=10_000,
+    ):
+        """
+        Args:
+            workers: Number of worker processes (defaults to the CPU count)
+            method: Default solving method, one of SudokuSolver.METHODS
+            max_steps: Largest step budget of a request (None for no limit)
+            timeout: Largest time budget of a request in seconds
+            max_batch: Most requests sent to a worker at once
+            max_delay: Seconds a batch waits for more requests
+            max_queue: Most requests waiting for a worker
+
+        Raises:
+            ValueError: If the method is unknown or a limit is not positive
+        """
+        if method not in SudokuSolver.METHODS:
+            raise ValueError(f"Unknown solving method: {method}")
+        check_budget(max_steps, timeout)
+        if timeout is None or max_batch < 1 or max_queue < 1:
+            raise ValueError("timeout, max_batch and max_queue must be positive")
+        self.workers = workers or os.cpu_count() or 1
+        self.method = method
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.metrics = ServiceMetrics()
+        self._pool = None
+        self._queue = None
+        self._slots = None
+        self._batcher = None
+        self._dispatches = set()
+
+    async def start(self):
+        """Start the worker pool and the batcher."""
+        self._pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+        # The workers are forked on the first submission. Doing it now, before
+        # any connection is accepted, keeps client sockets out of the workers;
+        # otherwise a closed connection would stay open in every worker.
+        await asyncio.get_running_loop().run_in_executor(self._pool, os.getpid)
+        self._queue = asyncio.Queue(self.max_queue)
+        self._slots = asyncio.Semaphore(2 * self.workers)
+        self._batcher = asyncio.create_task(self._run_batches())
+
+    async def close(self):
+        """Stop batching, cancel waiting requests and shut the pool down."""
+        if self._batcher is None:
+            return
+        self._batcher.cancel()
+        await asyncio.gather(self._batcher, return_exceptions=True)
+        self._batcher = None
+        while not self._queue.empty():
+            self._queue.get_nowait().future.cancel()
+        await asyncio.gather(*self._dispatches, return_exceptions=True)
+        # Joining the workers blocks, so it runs in a thread
+        await asyncio.to_thread(self._pool.shutdown, cancel_futures=True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @property
+    def queue_depth(self):
+        """Number of requests waiting for a worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def solve(self, board, method=None, max_steps=None, timeout=None):
+        """
+        Solve a board within the given budgets.
+
+        Args:
+            board: List of lists or numpy array (0 for empty cells)
+            method: One of SudokuSolver.METHODS (defaults to the service's)
+            max_steps: Optional step budget, at most the service's max_steps
+            timeout: Optional time budget in seconds, at most the service's
+
+        Returns:
+            SolveResult: The outcome; 'exhausted' is set when a budget ran
+            out and 'error' explains rejected boards
+
+        Raises:
+            ValueError: If the board is not square or larger than
+                        MAX_BOX_SIZE allows, the method is unknown,
+                        max_steps is not a positive integer or timeout not
+                        a positive number
+            ServiceOverloaded: If the request queue is full
+            Exception: Whatever failed in the worker pool, e.g.
+                       BrokenProcessPool if a worker died
+        """
+        board = np.asarray(board)
+        # Checked here so that a worker never builds an oversized board
+        if board_geometry(board.shape).box_size > MAX_BOX_SIZE:
+            size = MAX_BOX_SIZE**2
+            raise ValueError(f"Boards larger than {size}x{size} are not supported")
+        method = method or self.method
+        if method not in SudokuSolver.METHODS:
+            raise ValueError(f"Unknown solving method: {method}")
+        check_budget(max_steps, timeout)
+        max_steps = _bounded(max_steps, self.max_steps)
+        timeout = _bounded(timeout, self.timeout)
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        request = _Request(board, method, max_steps, time.time() + timeout, future)
+        try:
+            self._queue.put_nowait(request)
+        except asyncio.QueueFull:
+            self.metrics.rejected += 1
+            raise ServiceOverloaded("Too many requests waiting") from None
+        self.metrics.requests += 1
+
+        try:
+            # Cancelling the future on timeout drops the request if it has
+            # not been dispatched yet; otherwise its worker stops at the
+            # deadline on its own
+            result = await asyncio.wait_for(future, timeout + TIMEOUT_GRACE)
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            result = SolveResult(
+                method, False, None, 0, time.monotonic() - start, exhausted=True
+            )
+        self.metrics.record(result, time.monotonic() - start)
+        return result
+
+    async def _run_batches(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.max_delay)
+            # Share what is waiting among the workers, up to max_batch each
+            size = min(self.max_batch, -(-(self._queue.qsize() + 1) // self.workers))
+            while len(batch) < size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            # Requests that timed out or were cancelled while waiting
+            batch = [request for request in batch if not request.future.done()]
+            if not batch:
+                continue
+            await self._slots.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    def _replace_pool(self, broken):
+        """Start a fresh worker pool after a worker died, once per broken pool."""
+        if self._pool is broken:
+            self._pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        jobs = [
+            (request.board, request.method, request.max_steps, request.deadline)
+            for request in batch
+        ]
+        self.metrics.batches += 1
+        self.metrics.batched_requests += len(batch)
+        self.metrics.in_flight += 1
+        pool = self._pool
+        try:
+            results = await loop.run_in_executor(pool, _solve_batch, jobs)
+        except Exception as e:
+            if isinstance(e, concurrent.futures.BrokenExecutor):
+                self._replace_pool(pool)
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        finally:
+            self.metrics.in_flight -= 1
+            self._slots.release()
+        for request, result in zip(batch, results):
+            if not request.future.done():
+                request.future.set_result(result)
+
+    async def handle_request(self, method, path, body):
+        """
+        Answer one HTTP request.
+
+        Returns:
+            tuple: (status code, JSON-serializable payload)
+        """
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            return 200, self.metrics.snapshot(self.queue_depth)
+        if path != "/solve":
+            return 404, {"error": f"Unknown path: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST to solve a puzzle"}
+
+        try:
+            request = json.loads(body)
+            puzzle = request["puzzle"]
+            as_line = isinstance(puzzle, str)
+            board = parse_puzzle(puzzle) if as_line else np.asarray(puzzle, dtype=int)
+            result = await self.solve(
+                board,
+                request.get("method"),
+                request.get("max_steps"),
+                request.get("timeout"),
+            )
+        except ServiceOverloaded as e:
+            return 503, {"error": str(e)}
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            return 400, {"error": f"Invalid request: {e}"}
+        except Exception as e:
+            # Raised in or by the worker pool, e.g. RecursionError or
+            # BrokenProcessPool; the request itself was well-formed
+            return 500, {"error": f"Solver failed: {type(e).__name__}: {e}"}
+
+        solution = None
+        if result.solution is not None:
+            solution = (
+                format_puzzle(result.solution) if as_line else result.solution.tolist()
+            )
+        return 200, {
+            "solved": result.solved,
+            "solution": solution,
+            "exhausted": result.exhausted,
+            "steps": result.steps,
+            "elapsed": result.elapsed,
+            "error": result.error,
+        }
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it is closed."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_SIZE:
+                    status, payload = 413, {"error": "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    status, payload = await self.handle_request(method, path, body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    "\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service, host="127.0.0.1", port=8080, path=None):
+    """
+    Run a SolveService behind an HTTP server until cancelled.
+
+    Args:
+        service: The SolveService to expose
+        host: Interface to listen on
+        port: TCP port to listen on
+        path: Unix socket path to listen on instead of host and port
+    """
+    async with service:
+        if path is not None:
+            server = await asyncio.start_unix_server(service.handle_connection, path)
+        else:
+            server = await asyncio.start_server(service.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket")
+    parser.add_argument("--workers", type=int, help="worker processes")
+    parser.add_argument("--method", choices=SudokuSolver.METHODS, default="dlx")
+    parser.add_argument(
+        "--max-steps",
+        type=int,
+        default=200_000,
+        help="largest per-request step budget (0 for unlimited)",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=1.0, help="largest per-request seconds"
+    )
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument(
+        "--max-delay-ms", type=float, default=2.0, help="batch coalescing window"
+    )
+    args = parser.parse_args(argv)
+
+    service = SolveService(
+        args.workers,
+        args.method,
+        args.max_steps or None,
+        args.timeout,
+        args.max_batch,
+        args.max_delay_ms / 1000,
+    )
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
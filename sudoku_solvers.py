@@ -0,0 +1,720 @@
+import math
+import numbers
+import random
+import time
+
+from sudoku import Sudoku, mask_digits, popcount
+from sudoku_dlx import SudokuDLX
+from sudoku_propagation import CandidateGrid, Contradiction
+
+
+class SolverObserver:
+    """
+    No-op base class for objects that want to follow a solver's progress.
+
+    Solvers call these hooks as they search. Subclasses override only the
+    events they care about; visualization is implemented as one such observer
+    (see SudokuVisualSolver).
+    """
+
+    def on_start(self, method):
+        """Called once before the search starts."""
+
+    def on_focus(self, row, col):
+        """Called when the solver selects the cell at (row, col)."""
+
+    def on_place(self, row, col, num):
+        """Called after 'num' has been placed at (row, col)."""
+
+    def on_remove(self, row, col):
+        """Called after the value at (row, col) has been removed."""
+
+    def on_finish(self, solved):
+        """Called once after the search ends."""
+
+    def on_stats(self, stats):
+        """Called with the SolveStats of the search, when stats are collected."""
+
+
+# Techniques propagated at every node by iter_solutions and count_solutions.
+# Singles prune most of the tree; the pair and intersection techniques cost
+# more per node than they save on typical puzzles.
+SEARCH_TECHNIQUES = ("naked_single", "hidden_single")
+
+
+class BudgetExhausted(Exception):
+    """Raised inside a search when its step, node or time budget runs out."""
+
+
+# Placements between two checks of a solver's clock on a 9x9 board. Placing
+# costs more on larger boards, so they check proportionally more often;
+# searches whose nodes scan the whole board also check at every node.
+TIMEOUT_CHECK_INTERVAL = 1024
+
+
+def check_budget(max_steps=None, timeout=None, steps_name="max_steps"):
+    """
+    Check the step and time budgets of a search.
+
+    Args:
+        max_steps: None or a positive integer
+        timeout: None or a positive, finite number of seconds
+        steps_name: Name of the step budget in error messages
+
+    Raises:
+        ValueError: If a budget has any other value
+    """
+    if max_steps is not None and (
+        isinstance(max_steps, bool)
+        or not isinstance(max_steps, numbers.Integral)
+        or max_steps < 1
+    ):
+        raise ValueError(f"{steps_name} must be a positive integer, not {max_steps!r}")
+    if timeout is not None and (
+        isinstance(timeout, bool)
+        or not isinstance(timeout, numbers.Real)
+        or not math.isfinite(timeout)
+        or timeout <= 0
+    ):
+        raise ValueError(f"timeout must be a positive number, not {timeout!r}")
+
+
+class SolveStats:
+    """
+    Counters and phase timings of a search.
+
+    Stats are only collected on request (stats=True), so solves that do not
+    ask for them pay nothing. Instances can be merged to aggregate a batch.
+    """
+
+    def __init__(self):
+        self.nodes = 0  # Search nodes visited (cells the search chose a value for)
+        self.backtracks = 0  # Placements undone, or dead ends for grid searches
+        self.eliminations = 0  # Candidates removed by propagation
+        self.max_depth = 0  # Deepest point of the search
+        self.phases = {}  # Seconds spent per phase, e.g. "presolve" and "search"
+
+    def add_phase(self, name, seconds):
+        """Add 'seconds' to the time spent in a phase."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def merge(self, other):
+        """Add the counters and phase times of another SolveStats to this one."""
+        self.nodes += other.nodes
+        self.backtracks += other.backtracks
+        self.eliminations += other.eliminations
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for name, seconds in other.phases.items():
+            self.add_phase(name, seconds)
+        return self
+
+    def to_dict(self):
+        """Return the stats as a JSON-serializable dict."""
+        result = dict(vars(self))
+        result["phases"] = dict(self.phases)
+        return result
+
+    def __repr__(self):
+        return (
+            f"SolveStats(nodes={self.nodes}, backtracks={self.backtracks}, "
+            f"eliminations={self.eliminations}, max_depth={self.max_depth})"
+        )
+
+
+class _StatsRecorder(SolverObserver):
+    """
+    Observer that counts search events into a SolveStats and forwards them.
+
+    Depth is the number of cells the search has filled, so every method is
+    measured the same way.
+    """
+
+    def __init__(self, stats, observer):
+        self.stats = stats
+        self.observer = observer
+        self.depth = 0
+
+    def on_start(self, method):
+        self.observer.on_start(method)
+
+    def on_focus(self, row, col):
+        self.stats.nodes += 1
+        self.observer.on_focus(row, col)
+
+    def on_place(self, row, col, num):
+        self.depth += 1
+        if self.depth > self.stats.max_depth:
+            self.stats.max_depth = self.depth
+        self.observer.on_place(row, col, num)
+
+    def on_remove(self, row, col):
+        self.depth -= 1
+        self.stats.backtracks += 1
+        self.observer.on_remove(row, col)
+
+    def on_finish(self, solved):
+        self.observer.on_finish(solved)
+
+    def on_stats(self, stats):
+        self.observer.on_stats(stats)
+
+
+class SolveResult:
+    """Outcome of a headless solve."""
+
+    def __init__(
+        self,
+        method,
+        solved,
+        solution,
+        steps,
+        elapsed=0.0,
+        error=None,
+        exhausted=False,
+        stats=None,
+    ):
+        self.method = method
+        self.solved = solved
+        self.solution = solution
+        self.steps = steps
+        self.elapsed = elapsed  # Wall time of the search in seconds
+        self.error = error  # Why the board could not be solved, if it was rejected
+        self.exhausted = exhausted  # True if the search hit its step budget
+        self.stats = stats  # SolveStats, if they were requested
+
+    def __repr__(self):
+        return (
+            f"SolveResult(method={self.method!r}, solved={self.solved}, "
+            f"steps={self.steps})"
+        )
+
+
+class SudokuSolver(Sudoku):
+    """
+    Headless Sudoku solver.
+
+    Runs the same algorithms as SudokuAlgorithms without any rendering. Progress
+    can be followed by attaching a SolverObserver.
+    """
+
+    METHODS = (
+        "backtracking",
+        "stochastic",
+        "constraint_propagation",
+        "dlx",
+        "propagation",
+    )
+
+    def __init__(
+        self,
+        board=None,
+        observer=None,
+        rng=None,
+        max_steps=None,
+        presolve=False,
+        box_size=None,
+        stats=False,
+        timeout=None,
+    ):
+        """
+        Args:
+            board: Optional initial board of any box size (see Sudoku)
+            observer: Optional SolverObserver notified of every search event
+            rng: Optional random.Random used by the stochastic solver
+            max_steps: Optional limit on placements; the search gives up
+                       (SolveResult.exhausted) once it is exceeded
+            presolve: Fill in every cell that logical techniques can deduce
+                      (see sudoku_propagation) before searching
+            box_size: Size of the blocks; inferred from the board if None
+            stats: Collect a SolveStats for every solve (SolveResult.stats)
+            timeout: Optional limit on the search time in seconds; like
+                     max_steps, it ends the search with
+                     SolveResult.exhausted set
+
+        Raises:
+            ValueError: If the board is invalid, or max_steps or timeout
+                        is not positive
+        """
+        check_budget(max_steps, timeout)
+        super().__init__(board, box_size)
+        self.observer = observer if observer is not None else SolverObserver()
+        self.rng = rng if rng is not None else random.Random()
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self._deadline = None
+        self._next_check = math.inf
+        self._check_interval = max(
+            1, TIMEOUT_CHECK_INTERVAL * 81 // self.geometry.num_cells
+        )
+        self.presolve = presolve
+        self.collect_stats = stats
+        self.stats = None
+        self.steps = 0
+
+    def solve(self, method="constraint_propagation"):
+        """
+        Solve the board in place with the given method.
+
+        Args:
+            method: One of SudokuSolver.METHODS
+
+        Returns:
+            SolveResult: The outcome of the search
+
+        Raises:
+            ValueError: If the method is unknown
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown solving method: {method}")
+        return getattr(self, f"solve_{method}")()
+
+    def _place(self, row, col, num):
+        # A single comparison per placement covers both budgets
+        if self.steps >= self._next_check:
+            self._check_budget()
+        self._assign(row, col, num)
+        self.steps += 1
+        self.observer.on_place(row, col, num)
+
+    def _remove(self, row, col, num):
+        self._unassign(row, col, num)
+        self.observer.on_remove(row, col)
+
+    def _check_budget(self):
+        """Raise BudgetExhausted if a budget ran out, else schedule the next check."""
+        max_steps = math.inf if self.max_steps is None else self.max_steps
+        if self.steps >= max_steps:
+            raise BudgetExhausted
+        if self._deadline is None:
+            self._next_check = max_steps
+            return
+        if time.perf_counter() > self._deadline:
+            raise BudgetExhausted
+        self._next_check = min(self.steps + self._check_interval, max_steps)
+
+    def _check_deadline(self):
+        """Raise BudgetExhausted if the timeout has passed."""
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise BudgetExhausted
+
+    def _run(self, method, search):
+        self.steps = 0
+        stats = self.stats = SolveStats() if self.collect_stats else None
+        observer = self.observer
+        if stats is not None:
+            # Counting rides on the observer events, so it costs nothing
+            # unless it was asked for
+            self.observer = _StatsRecorder(stats, observer)
+        try:
+            self.observer.on_start(method)
+            start = time.perf_counter()
+            self._deadline = None if self.timeout is None else start + self.timeout
+            searching = None
+            exhausted = False
+            try:
+                self._check_budget()
+                if not self.presolve or self._presolve():
+                    searching = time.perf_counter()
+                    solved = search()
+                else:
+                    solved = False
+            except BudgetExhausted:
+                solved = False
+                exhausted = True
+            end = time.perf_counter()
+            if stats is not None:
+                if searching is None:
+                    searching = end
+                if self.presolve:
+                    stats.add_phase("presolve", searching - start)
+                stats.add_phase("search", end - searching)
+                self.observer.on_stats(stats)
+            self.observer.on_finish(solved)
+        finally:
+            self.observer = observer
+        return SolveResult(
+            method,
+            solved,
+            self.board.copy() if solved else None,
+            self.steps,
+            end - start,
+            exhausted=exhausted,
+            stats=stats,
+        )
+
+    def _apply(self, grid):
+        """
+        Place the values 'grid' has deduced beyond the current board.
+
+        Returns:
+            list: The (row, col, num) placements made
+        """
+        placed = []
+        size = self.size
+        for cell, num in enumerate(grid.values):
+            row, col = divmod(cell, size)
+            if num and not self.board[row, col]:
+                self._place(row, col, num)
+                placed.append((row, col, num))
+        return placed
+
+    def _presolve(self):
+        """Fill in logically deduced cells. Returns False if there is no solution."""
+        grid = CandidateGrid(self.board)
+        try:
+            grid.propagate()
+        except Contradiction:
+            return False
+        finally:
+            if self.stats is not None:
+                self.stats.eliminations += grid.eliminations
+        self._apply(grid)
+        return True
+
+    def _backtrack(self, randomize=False):
+        """
+        Iterative depth-first search over the empty cells in row-major order.
+
+        The empty cells are listed once up front and the search keeps an
+        explicit stack of fixed-size arrays indexed by depth: the candidates
+        still to try and the digit currently placed. No memory is allocated
+        per node.
+
+        Args:
+            randomize: Try the remaining candidates in random order instead
+                       of ascending
+
+        Returns:
+            bool: True if the board was completed
+        """
+        empties = [
+            divmod(cell, self.size)
+            for cell, num in enumerate(self.board.ravel().tolist())
+            if not num
+        ]
+        size = len(empties)
+        remaining = [0] * size
+        placed = [0] * size
+        random = self.rng.random
+
+        depth = 0
+        entering = True
+        while True:
+            if entering:
+                if depth == size:
+                    return True
+                row, col = empties[depth]
+                self.observer.on_focus(row, col)
+                remaining[depth] = self.candidates(row, col)
+            else:
+                row, col = empties[depth]
+                self._remove(row, col, placed[depth])
+
+            mask = remaining[depth]
+            if mask:
+                if randomize:
+                    # Drawing uniformly from the untried candidates at every
+                    # visit is the same as trying them in shuffled order
+                    bits = mask
+                    skip = int(random() * popcount(mask))
+                    while skip:
+                        bits &= bits - 1
+                        skip -= 1
+                    bit = bits & -bits
+                else:
+                    bit = mask & -mask
+                remaining[depth] = mask ^ bit
+                num = bit.bit_length()
+                placed[depth] = num
+                self._place(row, col, num)
+                depth += 1
+                entering = True
+            else:
+                depth -= 1
+                if depth < 0:
+                    return False
+                entering = False
+
+    def solve_backtracking(self):
+        """Solve Sudoku using simple backtracking"""
+        return self._run("backtracking", self._backtrack)
+
+    def solve_stochastic(self):
+        """Solve Sudoku using a stochastic approach (random sampling with backtracking)"""
+        return self._run("stochastic", lambda: self._backtrack(randomize=True))
+
+    def solve_constraint_propagation(self):
+        """Solve Sudoku using constraint propagation (looking ahead)"""
+
+        def find_min_possibilities():
+            """Find empty cell with fewest possible values"""
+            min_len = self.size + 1
+            min_pos = None
+
+            for i, values in enumerate(self.board.tolist()):
+                for j, num in enumerate(values):
+                    if num == 0:
+                        possible = self.candidates(i, j)
+                        count = popcount(possible)
+                        if count < min_len:
+                            min_len = count
+                            min_pos = (i, j, possible)
+                            if count == 0:
+                                return min_pos
+
+            return min_pos
+
+        def solve_recursive():
+            self._check_deadline()
+            cell = find_min_possibilities()
+            if not cell:
+                return True
+
+            row, col, possible = cell
+            self.observer.on_focus(row, col)
+
+            for num in mask_digits(possible):
+                self._place(row, col, num)
+                if solve_recursive():
+                    return True
+                self._remove(row, col, num)
+
+            return False
+
+        return self._run("constraint_propagation", solve_recursive)
+
+    def solve_dlx(self):
+        """Solve Sudoku using Dancing Links (Algorithm X)"""
+
+        def solve_exact_cover():
+            solver = SudokuDLX(self.board)
+            presolved = self.steps
+            try:
+                return solver.solve(self._place, self._remove) is not None
+            finally:
+                if self.stats is not None:
+                    # Every row Algorithm X tries is a node of its search tree
+                    self.stats.nodes += self.steps - presolved
+
+        return self._run("dlx", solve_exact_cover)
+
+    def solve_propagation(self):
+        """
+        Solve Sudoku by propagating logical techniques after every guess.
+
+        Each node applies naked/hidden singles, pointing/claiming and
+        naked/hidden pairs to a fixed point before branching on the cell
+        with the fewest candidates.
+        """
+
+        def solve_recursive(grid, base):
+            self._check_deadline()
+            try:
+                grid.propagate()
+            except Contradiction:
+                return False
+            finally:
+                if self.stats is not None:
+                    # Children start from a copy of their parent's count
+                    self.stats.eliminations += grid.eliminations - base
+            placed = self._apply(grid)
+            cell = grid.best_cell()
+            if cell is None:
+                return True
+
+            row, col = divmod(cell, self.size)
+            self.observer.on_focus(row, col)
+            for num in mask_digits(grid.candidates[cell]):
+                child = grid.copy()
+                try:
+                    child.place(cell, num)
+                except Contradiction:
+                    continue
+                self._place(row, col, num)
+                if solve_recursive(child, grid.eliminations):
+                    return True
+                self._remove(row, col, num)
+
+            for row, col, num in reversed(placed):
+                self._remove(row, col, num)
+            return False
+
+        return self._run(
+            "propagation", lambda: solve_recursive(CandidateGrid(self.board), 0)
+        )
+
+
+def solve(
+    board,
+    method="constraint_propagation",
+    observer=None,
+    max_steps=None,
+    presolve=False,
+    stats=False,
+    timeout=None,
+):
+    """
+    Solve a board without any rendering.
+
+    Args:
+        board: List of lists or numpy array (0 for empty cells)
+        method: One of SudokuSolver.METHODS
+        observer: Optional SolverObserver
+        max_steps: Optional limit on placements before giving up
+        presolve: Apply logical techniques before searching
+        stats: Collect a SolveStats (SolveResult.stats)
+        timeout: Optional limit on the search time in seconds
+
+    Returns:
+        SolveResult: The outcome of the search
+    """
+    solver = SudokuSolver(
+        board,
+        observer=observer,
+        max_steps=max_steps,
+        presolve=presolve,
+        stats=stats,
+        timeout=timeout,
+    )
+    return solver.solve(method)
+
+
+def iter_solutions(
+    board,
+    max_nodes=None,
+    timeout=None,
+    techniques=SEARCH_TECHNIQUES,
+    rng=None,
+    stats=None,
+):
+    """
+    Lazily enumerate the solutions of a board.
+
+    Depth-first search over CandidateGrid copies: every node propagates the
+    given techniques once, and all its children start from that shared
+    state. Solutions are produced one at a time, so stopping iteration stops
+    the search.
+
+    Args:
+        board: List of lists or numpy array (0 for empty cells)
+        max_nodes: Optional limit on the number of search nodes
+        timeout: Optional limit on the search time in seconds
+        techniques: Names from sudoku_propagation.TECHNIQUES applied per node
+        rng: Optional random.Random (or the random module) used to try the
+             digits of every branch in random order; the first solution is
+             then a random completion of the board
+        stats: Optional SolveStats that the search adds its counters and
+               "search" time to (max_depth counts nested guesses)
+
+    Yields:
+        numpy.ndarray: Each solution as a (size, size) array, e.g. (9, 9)
+
+    Raises:
+        ValueError: If the givens repeat a digit in a row, column or block,
+                    or max_nodes or timeout is not positive
+        BudgetExhausted: If max_nodes or timeout is reached first
+    """
+    check_budget(max_nodes, timeout, "max_nodes")
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    nodes = 0
+    stack = [CandidateGrid(board)]
+    # (parent eliminations, depth) of every grid on the stack, kept only
+    # when stats are collected
+    trail = [(0, 0)] if stats is not None else None
+    start = time.perf_counter()
+    try:
+        while stack:
+            if max_nodes is not None and nodes >= max_nodes:
+                raise BudgetExhausted(f"Search stopped after {nodes} nodes")
+            if deadline is not None and time.perf_counter() > deadline:
+                raise BudgetExhausted(f"Search stopped after {timeout} seconds")
+            nodes += 1
+
+            grid = stack.pop()
+            if stats is not None:
+                base, depth = trail.pop()
+                stats.nodes += 1
+                if depth > stats.max_depth:
+                    stats.max_depth = depth
+            try:
+                grid.propagate(techniques)
+            except Contradiction:
+                if stats is not None:
+                    stats.backtracks += 1
+                continue
+            finally:
+                if stats is not None:
+                    stats.eliminations += grid.eliminations - base
+            cell = grid.best_cell()
+            if cell is None:
+                yield grid.to_board()
+                continue
+
+            children = []
+            for num in mask_digits(grid.candidates[cell]):
+                child = grid.copy()
+                try:
+                    child.place(cell, num)
+                except Contradiction:
+                    if stats is not None:
+                        stats.backtracks += 1
+                    continue
+                children.append(child)
+            if rng is not None:
+                rng.shuffle(children)
+            else:
+                # Push in reverse so that smaller digits are explored first
+                children.reverse()
+            stack.extend(children)
+            if stats is not None:
+                trail.extend([(grid.eliminations, depth + 1)] * len(children))
+    finally:
+        if stats is not None:
+            stats.add_phase("search", time.perf_counter() - start)
+
+
+def count_solutions(
+    board,
+    limit=None,
+    max_nodes=None,
+    timeout=None,
+    techniques=SEARCH_TECHNIQUES,
+    stats=None,
+):
+    """
+    Count the solutions of a board, stopping as soon as 'limit' are found.
+
+    count_solutions(board, limit=2) == 1 is the usual uniqueness check: it
+    costs about as much as a single solve.
+
+    Args:
+        board: List of lists or numpy array (0 for empty cells)
+        limit: Stop once this many solutions are found (None for all)
+        max_nodes: Optional limit on the number of search nodes
+        timeout: Optional limit on the search time in seconds
+        techniques: Names from sudoku_propagation.TECHNIQUES applied per node
+        stats: Optional SolveStats to add the search counters to
+
+    Returns:
+        int: Number of solutions found, at most 'limit'
+
+    Raises:
+        ValueError: If the givens repeat a digit in a row, column or block,
+                    or max_nodes or timeout is not positive
+        BudgetExhausted: If max_nodes or timeout is reached before the
+                         count is known
+    """
+    check_budget(max_nodes, timeout, "max_nodes")
+    count = 0
+    if limit == 0:
+        return count
+    solutions = iter_solutions(board, max_nodes, timeout, techniques, stats=stats)
+    try:
+        for _ in solutions:
+            count += 1
+            if count == limit:
+                break
+    finally:
+        # Stop the search now so that its time is recorded in 'stats'
+        solutions.close()
+    return count
@@ -0,0 +1,338 @@
+import array
+import contextlib
+import os
+import struct
+import sys
+
+import numpy as np
+
+from sudoku import board_geometry
+from sudoku_solvers import SolverObserver
+
+# A trace is the starting board plus one uint32 per solver event:
+# bits 0-1 hold the kind, bits 2-6 the digit (0 for focus and remove events)
+# and the remaining bits the cell index (row * size + col).
+FOCUS = 0
+PLACE = 1
+REMOVE = 2
+
+_DIGIT_SHIFT = 2
+_CELL_SHIFT = 7
+
+# File layout: a 16-byte header, the method name, the starting board as
+# size * size bytes and the events as little-endian uint32. The header holds
+# the magic, version, box size, outcome, length of the method name (UTF-8)
+# and event count.
+MAGIC = b"SDKT"
+VERSION = 2
+_HEADER = struct.Struct("<4sBBBBQ")
+_UNKNOWN = 2  # 'solved' value of traces whose search did not finish
+
+
+class Trace:
+    """
+    Recorded events of one search, with the board they started from.
+
+    Traces are made by TraceRecorder or load_trace and shown with replay or
+    export_trace.
+    """
+
+    def __init__(self, board, method, events, solved=None):
+        """
+        Args:
+            board: Starting board (0 for empty cells)
+            method: Name of the solving method
+            events: Array-like of encoded uint32 events
+            solved: Outcome of the search, or None if it did not finish
+        """
+        self.board = np.array(board, dtype=np.uint8)
+        self.size = board_geometry(self.board.shape).size
+        self.method = method
+        self.events = np.asarray(events, dtype=np.uint32)
+        self.solved = solved
+
+    def __len__(self):
+        return len(self.events)
+
+    def decode(self, start=0, stop=None):
+        """
+        Decode events [start:stop].
+
+        Returns:
+            tuple: (kinds, rows, cols, digits) integer arrays
+        """
+        events = self.events[start:stop]
+        kinds = events & 3
+        digits = (events >> _DIGIT_SHIFT) & 31
+        rows, cols = np.divmod(events >> _CELL_SHIFT, self.size)
+        return kinds, rows, cols, digits
+
+    def apply(self, board, start, stop):
+        """
+        Apply the placements and removals of events [start:stop] to a board.
+
+        Only the last change of every cell matters, so this is a single
+        vectorized assignment however many events there are.
+
+        Args:
+            board: (size, size) array updated in place
+            start: Index of the first event
+            stop: Index after the last event
+
+        Returns:
+            int: Number of placements among the events
+        """
+        kinds, rows, cols, digits = self.decode(start, stop)
+        changes = kinds != FOCUS
+        cells = (rows * self.size + cols)[changes]
+        values = np.where(kinds[changes] == PLACE, digits[changes], 0)
+        _, first = np.unique(cells[::-1], return_index=True)
+        last = len(cells) - 1 - first
+        board.reshape(-1)[cells[last]] = values[last]
+        return int(np.count_nonzero(kinds == PLACE))
+
+    def board_at(self, step):
+        """Return the board after the first 'step' events."""
+        board = self.board.copy()
+        self.apply(board, 0, step)
+        return board
+
+    def save(self, path):
+        """
+        Write the trace to a file (see load_trace).
+
+        Raises:
+            ValueError: If the method name is longer than 255 bytes
+        """
+        box_size = board_geometry(self.board.shape).box_size
+        solved = _UNKNOWN if self.solved is None else int(self.solved)
+        method = self.method.encode()
+        if len(method) > 255:
+            raise ValueError("Method names are limited to 255 bytes")
+        header = _HEADER.pack(MAGIC, VERSION, box_size, solved, len(method), len(self))
+        with open(path, "wb") as f:
+            f.write(header)
+            f.write(method)
+            f.write(self.board.tobytes())
+            f.write(self.events.astype("<u4").tobytes())
+
+    def __repr__(self):
+        return (
+            f"Trace(method={self.method!r}, events={len(self)}, solved={self.solved})"
+        )
+
+
+def load_trace(path):
+    """
+    Read a trace written by Trace.save. The events are memory-mapped.
+
+    Raises:
+        ValueError: If the file is not a trace of a supported version
+    """
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError("Not a Sudoku trace file: truncated header")
+        magic, version, box_size, solved, name_length, count = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("Not a Sudoku trace file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported trace version: {version}")
+        method = f.read(name_length)
+        size = box_size * box_size
+        board = np.frombuffer(f.read(size * size), dtype=np.uint8)
+    events = np.empty(0, dtype="<u4")
+    if count:
+        events = np.memmap(
+            path,
+            dtype="<u4",
+            mode="r",
+            offset=_HEADER.size + name_length + size * size,
+            shape=(count,),
+        )
+    return Trace(
+        board.reshape(size, size),
+        method.decode(),
+        events,
+        None if solved == _UNKNOWN else bool(solved),
+    )
+
+
+class TraceRecorder(SolverObserver):
+    """
+    Observer that records a search as a compact trace.
+
+    The codes of every possible event are computed up front, so an event
+    costs a table lookup and an append to an array. A search can be recorded
+    at close to full speed and replayed later:
+
+        recorder = TraceRecorder(board)
+        SudokuSolver(board, observer=recorder).solve("dlx")
+        recorder.trace().save("search.trace")
+    """
+
+    def __init__(self, board):
+        """
+        Args:
+            board: The board handed to the solver
+
+        Raises:
+            ValueError: If the board has the wrong shape
+        """
+        self.board = np.array(board, dtype=np.uint8)
+        self.size = board_geometry(self.board.shape).size
+        self.method = None
+        self.solved = None
+        self.events = array.array("I")
+        size = self.size
+        cells = [
+            [(row * size + col) << _CELL_SHIFT for col in range(size)]
+            for row in range(size)
+        ]
+        self._focus = cells
+        self._place = [
+            [
+                [cell | num << _DIGIT_SHIFT | PLACE for num in range(size + 1)]
+                for cell in row
+            ]
+            for row in cells
+        ]
+        self._remove = [[cell | REMOVE for cell in row] for row in cells]
+
+    def on_start(self, method):
+        self.method = method
+        self.solved = None
+        del self.events[:]
+
+    def on_focus(self, row, col):
+        self.events.append(self._focus[row][col])
+
+    def on_place(self, row, col, num):
+        self.events.append(self._place[row][col][num])
+
+    def on_remove(self, row, col):
+        self.events.append(self._remove[row][col])
+
+    def on_finish(self, solved):
+        self.solved = solved
+
+    def trace(self):
+        """Return the events recorded so far as a Trace."""
+        events = np.frombuffer(self.events, dtype=np.uint32).copy()
+        return Trace(self.board, self.method or "", events, self.solved)
+
+
+def _dispatch(visual, kind, row, col, digit):
+    if kind == PLACE:
+        visual.on_place(row, col, digit)
+    elif kind == REMOVE:
+        visual.on_remove(row, col)
+    else:
+        visual.on_focus(row, col)
+
+
+def replay(trace, start=0, stop=None, render_every=1, max_fps=None, delay=0.0001):
+    """
+    Animate a trace in a SudokuVisualSolver window.
+
+    The board is fast-forwarded to event 'start' without drawing, then the
+    events up to 'stop' are played through the visual solver's observer
+    hooks, so frame skipping and the delay work as in a live search.
+
+    Args:
+        trace: The Trace to show
+        start: Index of the first event to animate
+        stop: Index after the last event to animate (defaults to the end)
+        render_every: Draw a frame every this many events
+        max_fps: Optional cap on the number of frames drawn per second
+        delay: Pause after every drawn frame in seconds
+
+    Returns:
+        SudokuVisualSolver: The window, showing the board after 'stop'
+    """
+    # Imported here so recording traces never loads matplotlib
+    from sudoku_visual_solver import SudokuVisualSolver
+
+    stop = len(trace) if stop is None else stop
+    visual = SudokuVisualSolver(trace.board_at(start), render_every, max_fps)
+    visual.delay = delay
+    visual.algorithm_name = trace.method
+    visual.on_start(trace.method)
+    kinds, rows, cols, digits = trace.decode(0, start)
+    visual.steps = int(np.count_nonzero(kinds == PLACE))
+
+    kinds, rows, cols, digits = trace.decode(start, stop)
+    for event in zip(kinds.tolist(), rows.tolist(), cols.tolist(), digits.tolist()):
+        _dispatch(visual, *event)
+    visual.on_finish(bool(trace.solved) and stop == len(trace))
+    return visual
+
+
+def export_trace(trace, path, every=1, fps=30, start=0, stop=None, dpi=100):
+    """
+    Render a trace offline to an animated GIF, a video or PNG frames.
+
+    A frame is drawn every 'every' events; the events in between are applied
+    to the board in one vectorized step, so long traces export quickly with
+    a large 'every'.
+
+    Args:
+        trace: The Trace to render
+        path: Destination ending in .gif (Pillow), another video extension
+              such as .mp4 (requires ffmpeg), or a directory for PNG frames
+        every: Number of events per frame
+        fps: Frames per second of the animation
+        start: Index of the first event
+        stop: Index after the last event (defaults to the end)
+        dpi: Resolution of the frames
+
+    Returns:
+        int: Number of frames written
+    """
+    import matplotlib.animation as animation
+    import matplotlib.pyplot as plt
+
+    from sudoku_visual_solver import SudokuVisualSolver
+
+    stop = len(trace) if stop is None else stop
+    # savefig skips blitted artists, and frames are only drawn by refresh()
+    visual = SudokuVisualSolver(
+        trace.board_at(start), render_every=sys.maxsize, blit=False
+    )
+    visual.delay = 0
+    visual.algorithm_name = trace.method
+    visual.on_start(trace.method)
+    visual.steps = trace.apply(visual.board.copy(), 0, start)
+
+    path = str(path)
+    if os.path.splitext(path)[1]:
+        if path.endswith(".gif"):
+            writer = animation.PillowWriter(fps=fps)
+        else:
+            writer = animation.FFMpegWriter(fps=fps)
+    else:
+        os.makedirs(path, exist_ok=True)
+        writer = None
+
+    frames = 0
+    saving = (
+        writer.saving(visual.fig, path, dpi) if writer else contextlib.nullcontext()
+    )
+    with saving:
+        for frame_start in range(start, stop, every):
+            frame_stop = min(frame_start + every, stop)
+            # Apply all but the last event at once; the last one goes through
+            # the hooks so the highlight shows what happened
+            visual.steps += trace.apply(visual.board, frame_start, frame_stop - 1)
+            kinds, rows, cols, digits = trace.decode(frame_stop - 1, frame_stop)
+            _dispatch(visual, int(kinds[0]), int(rows[0]), int(cols[0]), int(digits[0]))
+            visual.refresh()
+            if writer:
+                writer.grab_frame()
+            else:
+                visual.fig.savefig(
+                    os.path.join(path, f"frame_{frames:06d}.png"), dpi=dpi
+                )
+            frames += 1
+    plt.close(visual.fig)
+    return frames
@@ -0,0 +1,149 @@
+import functools
+import math
+
+import numpy as np
+
+# Unit numbering used in the results (9x9): rows 0-8, columns 9-17, blocks 18-26.
+# A board of size N numbers its 3N units the same way.
+NUM_UNITS = 27
+
+
+@functools.lru_cache(maxsize=None)
+def _digit_bits(size):
+    """
+    Lookup table from cell value to digit bit, indexed by value + 1 after
+    clipping values to [-1, size + 1].
+
+    Out-of-range values map to an extra bit that no valid unit can contain.
+    The narrowest dtype that holds the sum of a unit is used, so 9x9 boards
+    keep working on uint16.
+    """
+    out_of_range = 1 << size
+    dtype = np.uint16 if size <= 9 else np.uint32 if size <= 25 else np.uint64
+    return np.array(
+        [out_of_range, 0] + [1 << (d - 1) for d in range(1, size + 1)] + [out_of_range],
+        dtype=dtype,
+    )
+
+
+def unit_name(unit, size=9):
+    """Return a readable name ('row 3', 'column 0', 'block 8') for a unit index."""
+    kind, index = divmod(int(unit), size)
+    return f"{('row', 'column', 'block')[kind]} {index}"
+
+
+def _unit_views(bits, box_size):
+    """
+    Split (N, S, S) cell bits into S views of shape (N, 3S), one per cell position.
+
+    The k-th view holds the k-th cell of every row, column and block, so
+    reducing across the views reduces every unit at once without reordering
+    the cells in memory.
+    """
+    n = len(bits)
+    size = box_size * box_size
+    grid = bits.reshape(n, box_size, box_size, box_size, box_size)
+    return [
+        np.concatenate(
+            (
+                bits[:, :, k],
+                bits[:, k, :],
+                grid[:, :, k // box_size, :, k % box_size].reshape(n, size),
+            ),
+            axis=1,
+        )
+        for k in range(size)
+    ]
+
+
+def _validate_chunk(boards, complete, box_size):
+    size = box_size * box_size
+    bits = _digit_bits(size)[np.clip(boards, -1, size + 1) + 1]
+    views = _unit_views(bits, box_size)
+
+    # Digit bits are disjoint, so a unit repeats a digit exactly when the sum
+    # of its bits differs from their OR
+    seen = views[0].copy()
+    total = views[0].copy()
+    for view in views[1:]:
+        np.bitwise_or(seen, view, out=seen)
+        np.add(total, view, out=total)
+
+    bad = (total != seen) | (seen >> size).astype(bool)
+    if complete:
+        bad |= seen != (1 << size) - 1
+
+    has_error = bad.any(axis=1)
+    first = np.where(has_error, bad.argmax(axis=1), -1).astype(_unit_dtype(size))
+    return ~has_error, first
+
+
+def _unit_dtype(size):
+    return np.int8 if 3 * size < 128 else np.int16
+
+
+def infer_box_size(boards):
+    """
+    Infer the box size of a batch of boards.
+
+    Args:
+        boards: numpy array of shape (N, S, S) or (N, S*S)
+
+    Returns:
+        int: The box size, or None if S is not a perfect square or the
+             shape is neither of the above
+    """
+    if boards.ndim == 2:
+        side = math.isqrt(boards.shape[1])
+        if side * side != boards.shape[1]:
+            return None
+    elif boards.ndim == 3 and boards.shape[1] == boards.shape[2]:
+        side = boards.shape[1]
+    else:
+        return None
+    box_size = math.isqrt(side)
+    return box_size if side and box_size * box_size == side else None
+
+
+def validate_boards(boards, complete=False, chunk_size=65536):
+    """
+    Validate many boards at once.
+
+    A board of size S (9 for classic Sudoku) is valid when every cell holds
+    0 to S and no digit is repeated in a row, column or block. With
+    complete=True every unit must also contain all digits 1 to S.
+
+    Args:
+        boards: Array-like of shape (N, S, S) or (N, S*S) with S a perfect
+                square, e.g. (N, 9, 9) or (N, 81), ideally uint8
+        complete: Also require the boards to be completely filled
+        chunk_size: Number of boards processed per vectorized pass, which
+                    bounds the temporary memory used
+
+    Returns:
+        tuple: (valid, first_unit) where valid is a boolean array of shape (N,)
+               and first_unit is an integer array (int8 up to 36x36 boards)
+               holding, for each board, the index of the first offending unit
+               (see unit_name) or -1
+
+    Raises:
+        ValueError: If the boards do not have shape (N, S, S) or (N, S*S)
+    """
+    boards = np.asarray(boards)
+    box_size = infer_box_size(boards)
+    if box_size is None:
+        raise ValueError(
+            "Boards must have shape (N, S, S) or (N, S*S) with S a perfect square"
+        )
+    size = box_size * box_size
+    boards = boards.reshape(-1, size, size)
+
+    n = len(boards)
+    valid = np.empty(n, dtype=bool)
+    first_unit = np.empty(n, dtype=_unit_dtype(size))
+    for start in range(0, n, chunk_size):
+        stop = start + chunk_size
+        valid[start:stop], first_unit[start:stop] = _validate_chunk(
+            boards[start:stop], complete, box_size
+        )
+    return valid, first_unit
@@ -0,0 +1,206 @@
+import functools
+
+import numpy as np
+
+from sudoku import geometry
+from sudoku_solvers import SudokuSolver
+from sudoku_validation import infer_box_size
+
+# Candidates of N boards are held as an (N, S*S) array of digit bitmasks
+# (bit d - 1 set when digit d is possible), with one row per board. Every
+# step below works on all boards of a chunk at once; boards drop out of the
+# loop as soon as a pass leaves them unchanged.
+
+# Bytes of temporary arrays a propagation pass may allocate. The largest is
+# the (boards, cells, peers) gather of decided digits, so the number of
+# boards per pass shrinks quickly with the board size.
+CHUNK_BYTES = 64 << 20
+
+
+@functools.lru_cache(maxsize=None)
+def _tables(box_size):
+    """
+    Index tables of a board size.
+
+    Returns:
+        tuple: (peers, units, slots) where peers is (cells, peers per cell),
+               units is (3S, S) and slots[cell] holds the positions of the
+               cell in units.ravel() for its row, column and block
+    """
+    geo = geometry(box_size)
+    peers = np.array(geo.peers, dtype=np.intp)
+    units = np.array(geo.units, dtype=np.intp)
+    slots = np.empty((geo.num_cells, 3), dtype=np.intp)
+    for u, unit in enumerate(geo.units):
+        for i, cell in enumerate(unit):
+            slots[cell, u // geo.size] = u * geo.size + i
+    return peers, units, slots
+
+
+def _mask_dtype(size):
+    return np.uint16 if size <= 16 else np.uint32 if size <= 32 else np.uint64
+
+
+def _initial_candidates(boards, size):
+    """Candidate masks of flat boards; invalid values get no candidates."""
+    dtype = _mask_dtype(size)
+    table = np.array(
+        [0, (1 << size) - 1] + [1 << (d - 1) for d in range(1, size + 1)] + [0],
+        dtype=dtype,
+    )
+    return table[np.clip(boards, -1, size + 1) + 1]
+
+
+def _propagate(candidates, box_size):
+    """
+    Apply naked and hidden singles to a chunk of boards until nothing changes.
+
+    Args:
+        candidates: (N, S*S) candidate masks, updated in place
+        box_size: Box size of the boards
+
+    Returns:
+        numpy.ndarray: Boolean array of shape (N,), True for boards that
+                       turned out to have no solution
+    """
+    peers, units, slots = _tables(box_size)
+    size = box_size * box_size
+    all_digits = (1 << size) - 1
+    contradiction = np.zeros(len(candidates), dtype=bool)
+    active = np.arange(len(candidates))
+    while len(active):
+        masks = candidates[active]
+        n = len(masks)
+
+        # Naked singles: remove every decided digit from the cell's peers. A
+        # cell sharing its digit with a peer loses it too, which flags
+        # repeated givens as a contradiction.
+        decided = np.where((masks & (masks - 1)) == 0, masks, 0)
+        new = masks & ~np.bitwise_or.reduce(decided[:, peers], axis=2)
+
+        # Hidden singles: a digit that fits a single cell of a unit goes there
+        cells = new[:, units]
+        once = np.zeros((n, len(units)), dtype=new.dtype)
+        twice = np.zeros_like(once)
+        for k in range(size):
+            twice |= once & cells[:, :, k]
+            once |= cells[:, :, k]
+        only = (cells & (once & ~twice)[:, :, np.newaxis]).reshape(n, -1)
+        hidden = np.bitwise_or.reduce(only[:, slots], axis=2)
+        new = np.where(hidden != 0, hidden, new)
+
+        failed = (
+            (new == 0).any(axis=1)
+            | (once != all_digits).any(axis=1)
+            # A cell that is the only place for two digits
+            | ((hidden & (hidden - 1)) != 0).any(axis=1)
+        )
+        changed = (new != masks).any(axis=1)
+        candidates[active] = new
+        contradiction[active[failed]] = True
+        active = active[changed & ~failed]
+    return contradiction
+
+
+def _chunk_size(box_size):
+    """Number of boards whose propagation temporaries fit in CHUNK_BYTES."""
+    peers, _, _ = _tables(box_size)
+    itemsize = np.dtype(_mask_dtype(box_size * box_size)).itemsize
+    return max(1, CHUNK_BYTES // (peers.size * itemsize))
+
+
+def _flat_boards(boards):
+    boards = np.asarray(boards)
+    box_size = infer_box_size(boards)
+    if box_size is None:
+        raise ValueError(
+            "Boards must have shape (N, S, S) or (N, S*S) with S a perfect square"
+        )
+    return boards.reshape(len(boards), -1), box_size
+
+
+def propagate_boards(boards, chunk_size=None):
+    """
+    Propagate naked and hidden singles on many boards at once.
+
+    Args:
+        boards: Array-like of shape (N, S, S) or (N, S*S) (0 for empty cells)
+        chunk_size: Number of boards processed per vectorized pass; by
+                    default as many as keep the temporary arrays within
+                    CHUNK_BYTES (about 20k 9x9 or 400 25x25 boards)
+
+    Returns:
+        tuple: (candidates, contradiction) where candidates is an (N, S*S)
+               array of digit bitmasks (uint16 up to 16x16 boards) and
+               contradiction a boolean array of shape (N,) flagging boards
+               with invalid givens or no solution
+
+    Raises:
+        ValueError: If the boards do not have shape (N, S, S) or (N, S*S)
+    """
+    boards, box_size = _flat_boards(boards)
+    size = box_size * box_size
+    candidates = _initial_candidates(boards, size)
+    contradiction = np.empty(len(boards), dtype=bool)
+    if chunk_size is None:
+        chunk_size = _chunk_size(box_size)
+    for start in range(0, len(boards), chunk_size):
+        stop = start + chunk_size
+        contradiction[start:stop] = _propagate(candidates[start:stop], box_size)
+    return candidates, contradiction
+
+
+def decided_values(candidates):
+    """
+    Turn candidate masks into cell values: the digit where a single one is
+    left, 0 elsewhere.
+
+    Returns:
+        numpy.ndarray: uint8 array with the shape of 'candidates'
+    """
+    candidates = np.asarray(candidates)
+    single = (candidates != 0) & ((candidates & (candidates - 1)) == 0)
+    # The exponent of a power of two 2**(d - 1) as a float is d
+    digits = np.frexp(candidates.astype(np.float64))[1]
+    return np.where(single, digits, 0).astype(np.uint8)
+
+
+def solve_boards(boards, method="dlx", max_steps=None, chunk_size=None):
+    """
+    Solve many boards, with vectorized propagation first.
+
+    Boards completed by naked and hidden singles never leave numpy. The
+    others are handed, with the values found so far, to a SudokuSolver.
+
+    Args:
+        boards: Array-like of shape (N, S, S) or (N, S*S) (0 for empty cells)
+        method: One of SudokuSolver.METHODS, used for the remaining boards
+        max_steps: Optional step budget of each fallback search
+        chunk_size: Number of boards propagated per vectorized pass
+                    (see propagate_boards)
+
+    Returns:
+        tuple: (solutions, solved) where solutions is an (N, S, S) uint8
+               array (all zeros for unsolved boards) and solved is a boolean
+               array of shape (N,)
+
+    Raises:
+        ValueError: If the boards have the wrong shape or the method is
+                    unknown
+    """
+    if method not in SudokuSolver.METHODS:
+        raise ValueError(f"Unknown solving method: {method}")
+    boards, box_size = _flat_boards(boards)
+    size = box_size * box_size
+    candidates, contradiction = propagate_boards(boards, chunk_size)
+    values = decided_values(candidates)
+    solved = ~contradiction & (values != 0).all(axis=1)
+
+    for index in np.flatnonzero(~contradiction & ~solved):
+        solver = SudokuSolver(values[index].reshape(size, size), max_steps=max_steps)
+        result = solver.solve(method)
+        if result.solved:
+            values[index] = result.solution.ravel()
+            solved[index] = True
+    values[~solved] = 0
+    return values.reshape(-1, size, size), solved
@@ -1,24 +1,71 @@
+import time
+
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.transforms import Bbox
 from sudoku import Sudoku
+from sudoku_solvers import SolverObserver
+
+# Margin between the highlight and the cell borders, in cells
+HIGHLIGHT_INSET = 0.04
+
 
+class SudokuVisualSolver(Sudoku, SolverObserver):
+    """
+    Matplotlib view of a Sudoku board.
 
-class SudokuVisualSolver(Sudoku):
-    def __init__(self, board=None):
+    Implements the SolverObserver hooks so it can be attached to a headless
+    SudokuSolver and animate its search.
+
+    The grid is drawn once per search. Cell numbers, the highlighted cell and
+    the step counter are persistent artists that are updated in place; on
+    canvases that support blitting, a frame only repaints the cells that
+    changed over their saved background, so it costs the same on the first
+    step and the millionth. Long searches can drop frames with render_every
+    and max_fps; the final board is always drawn.
+    """
+
+    def __init__(self, board=None, render_every=1, max_fps=None, blit=True):
+        """
+        Args:
+            board: Optional list of lists or numpy array (0 for empty cells)
+            render_every: Draw a frame every this many solver events
+            max_fps: Optional cap on the number of frames drawn per second
+            blit: Use blitting where the canvas supports it. Turn it off when
+                  frames are saved with savefig, which skips blitted artists.
+        """
         super().__init__(board)
         self.fig, self.ax = plt.subplots(figsize=(10, 10))
         self.delay = 0.0001  # Delay between steps in seconds
         self.steps = 0  # Initialize step counter
+        self.algorithm_name = None
+        self.render_every = max(1, render_every)
+        self.max_fps = max_fps
+        self.blit = blit
+        self._texts = None  # One text artist per cell
+        self._shown = None  # Values the text artists currently display
+        self._highlight = None
+        self._highlighted = None  # (row, col) under the highlight, if any
+        self._counter = None
+        self._dirty = set()  # Cells to repaint in the next frame
+        self._backgrounds = None  # Saved pixels of every cell and the counter
+        self._events = 0
+        self._last_frame = 0.0
+        self.fig.canvas.mpl_connect("draw_event", self._on_draw)
 
     def _draw_grid(self, algorithm_name=None):
-        """Draw the Sudoku grid with current numbers."""
+        """Draw the static grid once and create the artists updated by _render."""
+        size, box_size = self.size, self.box_size
+        # Without blitting, the artists are drawn by regular (full) redraws
+        animated = self.blit and self.fig.canvas.supports_blit
         self.ax.clear()
+        self._backgrounds = None
 
         # Add algorithm name if provided
         if algorithm_name:
             self.ax.text(
-                4.5,
-                9.7,
+                size / 2,
+                size + 0.7,
                 algorithm_name,
                 ha="center",
                 va="center",
@@ -27,38 +74,184 @@ class SudokuVisualSolver(Sudoku):
             )
 
         # Draw the main grid
-        for i in range(10):
-            lw = 2 if i % 3 == 0 else 0.5
-            # Limitar las líneas horizontales al área del Sudoku (0-9)
-            self.ax.plot([0, 9], [i, i], color="black", linewidth=lw)
-            # Limitar las líneas verticales al área del Sudoku (0-9)
-            self.ax.plot([i, i], [0, 9], color="black", linewidth=lw)
-
-        # Fill in the numbers
-        for i in range(9):
-            for j in range(9):
-                if self.board[i, j] != 0:
-                    self.ax.text(
-                        j + 0.5,
-                        8.5 - i,
-                        str(int(self.board[i, j])),
-                        ha="center",
-                        va="center",
-                    )
-
-        # Add step counter text
-        self.ax.text(4.5, -0.5, f"Steps: {self.steps}", ha="center", va="center")
-
-        self.ax.set_xlim(0, 9)
-        self.ax.set_ylim(
-            -1, 10.5
-        )  # Adjusted to give more space to the title and counter
+        for i in range(size + 1):
+            lw = 2 if i % box_size == 0 else 0.5
+            self.ax.plot([0, size], [i, i], color="black", linewidth=lw)
+            self.ax.plot([i, i], [0, size], color="black", linewidth=lw)
+
+        # Inset and not antialiased, so the highlight stays inside the saved
+        # background of its cell
+        self._highlight = plt.Rectangle(
+            (0, 0),
+            1 - 2 * HIGHLIGHT_INSET,
+            1 - 2 * HIGHLIGHT_INSET,
+            visible=False,
+            antialiased=False,
+            animated=animated,
+        )
+        self.ax.add_patch(self._highlight)
+        self._highlighted = None
+        self._texts = [
+            [
+                self.ax.text(
+                    j + 0.5,
+                    size - 0.5 - i,
+                    "",
+                    ha="center",
+                    va="center",
+                    animated=animated,
+                )
+                for j in range(size)
+            ]
+            for i in range(size)
+        ]
+        self._shown = np.zeros_like(self.board)
+        self._counter = self.ax.text(
+            size / 2, -0.5, "", ha="center", va="center", animated=animated
+        )
+
+        self.ax.set_xlim(0, size)
+        # Extra space below and above the grid for the counter and the title
+        self.ax.set_ylim(-1, size + 1.5)
         self.ax.set_xticks([])
         self.ax.set_yticks([])
-        plt.pause(0.001)
+        self._update_artists()
+        # The draw event saves the backgrounds and paints the artists on top
+        self.fig.canvas.draw()
+
+    def _cell_bbox(self, row, col):
+        """Display-space box of a cell, or of the counter area for row None."""
+        size = self.size
+        if row is None:
+            corners = [(0, -1), (size, 0)]
+        else:
+            corners = [(col, size - 1 - row), (col + 1, size - row)]
+        return Bbox(self.ax.transData.transform(corners))
+
+    def _update_artists(self):
+        """Bring the text artists in line with the board, touching only changed cells."""
+        for i, j in zip(*np.nonzero(self.board != self._shown)):
+            value = self.board[i, j]
+            self._texts[i][j].set_text(str(int(value)) if value else "")
+            self._dirty.add((i, j))
+        self._shown[:] = self.board
+        self._counter.set_text(f"Steps: {self.steps}")
+
+    def _on_draw(self, event):
+        """Save the cell backgrounds after a full redraw (first frame, resize)."""
+        if self._counter is None or not self._counter.get_animated():
+            return
+        canvas = self.fig.canvas
+        cells = [(i, j) for i in range(self.size) for j in range(self.size)]
+        self._backgrounds = {
+            cell: (canvas.copy_from_bbox(bbox), bbox)
+            for cell in cells + [(None, None)]
+            for bbox in [self._cell_bbox(*cell)]
+        }
+        self._dirty.update(cells)
+        self._blit()
+
+    def _blit(self):
+        """Repaint the dirty cells and the counter over their backgrounds."""
+        canvas = self.fig.canvas
+        boxes = []
+        for cell in self._dirty | {(None, None)}:
+            background, bbox = self._backgrounds[cell]
+            canvas.restore_region(background)
+            if cell == (None, None):
+                self.ax.draw_artist(self._counter)
+            else:
+                if cell == self._highlighted:
+                    self.ax.draw_artist(self._highlight)
+                self.ax.draw_artist(self._texts[cell[0]][cell[1]])
+            boxes.append(bbox)
+        self._dirty.clear()
+        canvas.blit(Bbox.union(boxes))
+        canvas.flush_events()
+
+    def _render(self, force=False):
+        """
+        Draw a frame, unless frame skipping drops it.
+
+        Returns:
+            bool: True if a frame was drawn
+        """
+        self._events += 1
+        now = time.perf_counter()
+        if not force:
+            if self._events % self.render_every:
+                return False
+            if self.max_fps and now - self._last_frame < 1 / self.max_fps:
+                return False
+        self._last_frame = now
+        if self._texts is None:
+            self._draw_grid(self.algorithm_name)
+        self._update_artists()
+        canvas = self.fig.canvas
+        if self._backgrounds is not None:
+            self._blit()
+        else:
+            canvas.draw_idle()
+            canvas.flush_events()
+        # Only GUI canvases have a window to keep responsive; elsewhere
+        # (e.g. Agg) the event loop would just sleep
+        if self.delay and canvas.required_interactive_framework is not None:
+            canvas.start_event_loop(self.delay)
+        return True
+
+    def refresh(self):
+        """Draw the current board now, regardless of frame skipping."""
+        self._render(force=True)
 
     def highlight_cell(self, row, col, color="yellow", alpha=0.3):
         """Highlight a cell to show the current focus."""
-        self.ax.add_patch(
-            plt.Rectangle((col, 8 - row), 1, 1, facecolor=color, alpha=alpha)
+        if self._highlight is None:
+            # The highlight patch is created with the grid
+            self._draw_grid(self.algorithm_name)
+        self._dirty.add(self._highlighted)
+        self._dirty.add((row, col))
+        self._dirty.discard(None)
+        self._highlighted = (row, col)
+        self._highlight.set_xy(
+            (col + HIGHLIGHT_INSET, self.size - 1 - row + HIGHLIGHT_INSET)
         )
+        self._highlight.set_facecolor(color)
+        self._highlight.set_alpha(alpha)
+        self._highlight.set_visible(True)
+
+    def on_start(self, method):
+        self.steps = 0
+        self._events = 0
+        self._draw_grid(self.algorithm_name)
+        self._render(force=True)
+
+    def on_focus(self, row, col):
+        self.highlight_cell(row, col)
+        self._render()
+
+    def on_place(self, row, col, num):
+        # Through _assign/_unassign, so the masks stay valid for later moves
+        self._assign(row, col, num)
+        self.steps += 1
+        self.highlight_cell(row, col, color="green", alpha=0.2)
+        self._render()
+
+    def on_remove(self, row, col):
+        num = int(self.board[row, col])
+        if num:
+            self._unassign(row, col, num)
+        self.highlight_cell(row, col, color="red", alpha=0.2)
+        self._render()
+
+    def on_finish(self, solved):
+        # Hand the artists back to regular drawing, so the final board stays
+        # on screen through later full redraws (titles, plt.show, resizes)
+        self._update_artists()
+        self._highlight.set_animated(False)
+        self._counter.set_animated(False)
+        for row in self._texts:
+            for text in row:
+                text.set_animated(False)
+        self._backgrounds = None
+        self._dirty.clear()
+        self.fig.canvas.draw_idle()